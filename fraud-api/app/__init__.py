@@ -5,8 +5,32 @@ def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
 
+    # Fast JSON codec (orjson with a stdlib fallback) for requests and responses
+    from app.json_provider import FastJSONProvider
+    app.json = FastJSONProvider(app, backend=app.config.get('JSON_PROVIDER', 'auto'))
+
     # Register Blueprints
     from app.api.routes import api_bp
     app.register_blueprint(api_bp, url_prefix='/api/v1')
 
+    from app.api.admin import admin_bp
+    app.register_blueprint(admin_bp, url_prefix='/api/v1/admin')
+
+    from app.api.ops import ops_bp
+    app.register_blueprint(ops_bp)
+
+    # Apply config-driven settings (micro-batching, ...) to the shared engine
+    # and start loading the model in the background
+    from app.services.fraud_engine import fraud_service
+    fraud_service.init_app(app)
+
+    # Request sampling profiler; installs no hooks unless PROFILING_ENABLED
+    from app.services.profiler import profiler
+    profiler.init_app(app)
+
+    # Token buckets + in-flight limit in front of the scoring endpoints;
+    # installs no hooks unless ADMISSION_ENABLED
+    from app.services.admission import admission
+    admission.init_app(app)
+
     return app
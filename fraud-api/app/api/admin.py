@@ -0,0 +1,153 @@
+import hmac
+import time
+
+from flask import Blueprint, Response, request, jsonify, current_app
+from app.services.audit import AuditReader
+from app.services.fraud_engine import fraud_service
+from app.services.profiler import profiler
+
+admin_bp = Blueprint('admin', __name__)
+
+
+@admin_bp.before_request
+def require_admin_token():
+    token = current_app.config.get('ADMIN_TOKEN')
+    if not token:
+        return jsonify({"error": "Admin API disabled (ADMIN_TOKEN not set)"}), 403
+    if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), token):
+        return jsonify({"error": "Invalid admin token"}), 401
+
+
+# --- Hot reload: load + warm a version, then swap it in atomically ---
+@admin_bp.route('/reload', methods=['POST'])
+def reload_model():
+    data = request.get_json(silent=True) or {}
+    version = data.get('version') if isinstance(data, dict) else None
+    if not isinstance(data, dict) or not (version is None or isinstance(version, str) and version):
+        return jsonify({"error": "version must be a model version string (omit it for the latest)"}), 400
+    try:
+        result = fraud_service.reload(version=version)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except FileNotFoundError as e:
+        return jsonify({"error": str(e)}), 404
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    return jsonify(result), 200
+
+
+# --- Rules: recompile the rule cascade from RULES_FILE ---
+@admin_bp.route('/rules/reload', methods=['POST'])
+def reload_rules():
+    try:
+        result = fraud_service.reload_rules()
+    except (ValueError, OSError) as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(result), 200
+
+
+# --- Model registry: re-read the routing table ---
+@admin_bp.route('/registry/reload', methods=['POST'])
+def reload_registry():
+    try:
+        result = fraud_service.reload_registry()
+    except (ValueError, OSError) as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(result), 200
+
+
+# --- Shadow mode: candidate versions scored in the background ---
+@admin_bp.route('/shadow', methods=['POST'])
+def set_shadow():
+    data = request.get_json(silent=True) or {}
+    versions = data.get('versions') if isinstance(data, dict) else None
+    if not isinstance(versions, list) or not all(isinstance(v, str) and v for v in versions):
+        return jsonify({"error": "versions must be a list of model versions"}), 400
+    try:
+        result = fraud_service.set_shadow(versions)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except FileNotFoundError as e:
+        return jsonify({"error": str(e)}), 404
+    return jsonify(result), 200
+
+
+@admin_bp.route('/shadow', methods=['DELETE'])
+def clear_shadow():
+    return jsonify(fraud_service.set_shadow([])), 200
+
+
+# --- Audit log: query flushed decisions (mmap reader) ---
+@admin_bp.route('/audit', methods=['GET'])
+def audit_query():
+    audit = fraud_service.audit
+    if audit is None:
+        return jsonify({"error": "Audit log is disabled (AUDIT_DIR not set)"}), 409
+    since = request.args.get('since', type=float)
+    if since is None:
+        since = time.time() - current_app.config['AUDIT_QUERY_WINDOW_SECONDS']
+    until = request.args.get('until', type=float)
+    limit = max(request.args.get('limit', 100, type=int), 0)
+    # Newest blocks first, stopping at `limit` rows; strings decoded only for those
+    columns = AuditReader(audit.directory).tail(limit, since, until)
+    n = len(columns['ts'])
+    records = [
+        {name: values[i].item() if hasattr(values[i], 'item') else values[i] for name, values in columns.items()}
+        for i in range(n)
+    ]
+    for record in records:
+        prob = record['fraud_probability']
+        record['fraud_probability'] = round(prob, 4) if prob == prob else None   # NaN: a rule decided
+    return jsonify({
+        "since": since,
+        "rows": n,
+        "blocked": int(columns['is_blocked'].sum()),
+        "records": records,
+    }), 200
+
+
+# --- Drift: live distributions vs the model's reference snapshot ---
+@admin_bp.route('/drift', methods=['GET'])
+def drift_report():
+    try:
+        return jsonify(fraud_service.drift_report()), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 409
+
+
+@admin_bp.route('/drift/reference', methods=['POST'])
+def drift_reference():
+    try:
+        return jsonify(fraud_service.save_drift_reference()), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 409
+    except OSError as e:
+        return jsonify({"error": str(e)}), 500
+
+
+# --- Profiling: aggregated cProfile report of sampled requests ---
+@admin_bp.route('/profile', methods=['GET'])
+def profile_report():
+    sort = request.args.get('sort', 'cumulative')
+    if sort not in ('cumulative', 'tottime', 'ncalls', 'time', 'calls'):
+        return jsonify({"error": f"Unknown sort key '{sort}'"}), 400
+    limit = request.args.get('limit', 40, type=int)
+    return Response(profiler.report(sort=sort, limit=limit), mimetype='text/plain')
+
+
+@admin_bp.route('/profile', methods=['POST'])
+def profile_settings():
+    if not profiler.enabled:
+        return jsonify({"error": "Profiling is disabled (PROFILING_ENABLED not set)"}), 409
+    data = request.get_json(silent=True) or {}
+    rate = data.get('sample_rate') if isinstance(data, dict) else None
+    if isinstance(rate, bool) or not isinstance(rate, (int, float)) or not 0 <= rate <= 1:
+        return jsonify({"error": "sample_rate must be a number between 0 and 1"}), 400
+    profiler.sample_rate = float(rate)
+    return jsonify({"sample_rate": profiler.sample_rate}), 200
+
+
+@admin_bp.route('/profile', methods=['DELETE'])
+def profile_reset():
+    profiler.reset()
+    return jsonify({"status": "reset"}), 200
@@ -0,0 +1,137 @@
+from time import perf_counter
+
+from app.services.fraud_engine import fraud_service
+from app.services.metrics import metrics
+from app.services.batcher import QueueFullError
+from app.api.validation import (
+    TRANSACTION_SCHEMA, parse_entities, parse_entities_many, parse_route, parse_transaction,
+    parse_transaction_id,
+)
+
+# Framework-free request handlers: take the decoded JSON body and return
+# (response_body, status). Shared by the Flask routes and the ASGI app.
+
+MODEL_NOT_LOADED = ({"error": "Model not loaded"}, 503)
+
+
+def _explain_flag(data):
+    # Returns (explain, error)
+    explain = data.get('explain', False) if isinstance(data, dict) else False
+    if not isinstance(explain, bool):
+        return False, "explain must be true or false"
+    return explain, None
+
+
+def _drop_rows(bad, features, positions, *columns):
+    # Removes the rows at indices `bad` from the feature matrix, positions
+    # and every parallel per-row list (None = not collected) in one pass
+    bad = set(bad)
+    keep = [k for k in range(len(positions)) if k not in bad]
+    return (
+        features[keep], [positions[k] for k in keep],
+        *(None if column is None else [column[k] for k in keep] for column in columns),
+    )
+
+
+def handle_predict(data):
+    if not fraud_service.ready.is_set():
+        return MODEL_NOT_LOADED
+    try:
+        # Reject bad rows up front so they never end up in a shared batch
+        start = perf_counter()
+        row, error = parse_transaction(data)
+        if not error:
+            transaction_id, error = parse_transaction_id(data)
+        if not error:
+            entities, error = parse_entities(data)
+        if not error:
+            explain, error = _explain_flag(data)
+        route = None
+        if not error and fraud_service.registry is not None:
+            route, error = parse_route(data)
+        metrics.observe('validate', perf_counter() - start)
+        if error:
+            return {"error": error}, 400
+        amount, ip_risk, time = row
+        result = fraud_service.predict(
+            amount=amount, ip_risk=ip_risk, time=time,
+            transaction_id=transaction_id, entities=entities, explain=explain, route=route,
+        )
+        return result, 200
+    except QueueFullError as e:
+        return {"error": str(e)}, 503
+    except Exception as e:
+        return {"error": str(e)}, 500
+
+
+def handle_predict_batch(data, max_items):
+    if not fraud_service.ready.is_set():
+        return MODEL_NOT_LOADED
+    items = data.get('transactions') if isinstance(data, dict) else None
+    if not isinstance(items, list):
+        return {"error": "Body must be {\"transactions\": [...]}"}, 400
+    if len(items) > max_items:
+        return {"error": f"At most {max_items} transactions per batch"}, 413
+    explain, error = _explain_flag(data)
+    if error:
+        return {"error": error}, 400
+
+    # Validate everything first (column-wise), then score only the good rows
+    start = perf_counter()
+    features, positions, errors = TRANSACTION_SCHEMA.parse_many(items)
+    results = [None] * len(items)
+    for i, error in errors.items():
+        results[i] = {"error": error}
+
+    # Entity ids only matter when velocity features are being computed
+    entities = None
+    if fraud_service.feature_store is not None and positions:
+        entities, bad = parse_entities_many([items[i] for i in positions])
+        if bad:
+            for k in bad:
+                results[positions[k]] = {"error": bad[k]}
+            features, positions, entities = _drop_rows(bad, features, positions, entities)
+
+    # Rows with a transaction_id are deduplicated like single predictions,
+    # which makes retrying a whole batch safe
+    transaction_ids = None
+    if positions:
+        transaction_ids, bad = [], []
+        for k, i in enumerate(positions):
+            transaction_id, error = parse_transaction_id(items[i])
+            if error:
+                results[i] = {"error": error}
+                bad.append(k)
+            transaction_ids.append(transaction_id)
+        if bad:
+            features, positions, transaction_ids, entities = _drop_rows(
+                bad, features, positions, transaction_ids, entities
+            )
+        if not any(transaction_ids):
+            transaction_ids = None
+
+    # Routing keys only matter when a model registry is configured
+    routes = None
+    if fraud_service.registry is not None and positions:
+        routes, bad = [], []
+        for k, i in enumerate(positions):
+            route, error = parse_route(items[i])
+            if error:
+                results[i] = {"error": error}
+                bad.append(k)
+            routes.append(route)
+        if bad:
+            features, positions, routes, entities, transaction_ids = _drop_rows(
+                bad, features, positions, routes, entities, transaction_ids
+            )
+    metrics.observe('validate', perf_counter() - start)
+
+    try:
+        scored = fraud_service.predict_batch(features, entities, explain, routes, transaction_ids)
+    except Exception as e:
+        return {"error": str(e)}, 500
+
+    for i, result in zip(positions, scored):
+        results[i] = result
+
+    return {"results": results}, 200
@@ -0,0 +1,30 @@
+from flask import Blueprint, Response, jsonify
+from app.services.fraud_engine import fraud_service
+from app.services.metrics import metrics
+
+ops_bp = Blueprint('ops', __name__)
+
+
+# --- Probes for the orchestrator (mounted at the root, not under /api/v1) ---
+@ops_bp.route('/healthz', methods=['GET'])
+def healthz():
+    # Liveness: the process is up and serving HTTP
+    return jsonify({"status": "ok"}), 200
+
+
+@ops_bp.route('/readyz', methods=['GET'])
+def readyz():
+    # Readiness: only send traffic once the model is loaded and warmed
+    if fraud_service.ready.is_set():
+        return jsonify({"status": "ready", **fraud_service.startup}), 200
+
+    body = {"status": "loading" if fraud_service.loading else "unavailable"}
+    if fraud_service.load_error:
+        body["error"] = fraud_service.load_error
+    return jsonify(body), 503
+
+
+# --- Prometheus scrape endpoint ---
+@ops_bp.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
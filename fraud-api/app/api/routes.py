@@ -1,21 +1,73 @@
-from flask import Blueprint, request, jsonify, render_template
+from time import perf_counter
+
+from flask import (
+    Blueprint, Response, request, jsonify, render_template, current_app, stream_with_context,
+)
+from werkzeug.exceptions import HTTPException
+from app.services.admission import admission
 from app.services.fraud_engine import fraud_service
+from app.services.metrics import metrics
+from app.api.handlers import handle_predict, handle_predict_batch
+from app.api.streaming import read_lines, score_ndjson
 
 api_bp = Blueprint('api', __name__)
 
 # --- 1. THE EXISTING API (For Computers/CURL) ---
 @api_bp.route('/predict', methods=['POST'])
 def predict():
+    start = perf_counter()
     try:
         data = request.get_json()
-        result = fraud_service.predict(
-            amount=data.get('amount'),
-            ip_risk=data.get('ip_risk'),
-            time=data.get('time')
-        )
-        return jsonify(result), 200
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    except HTTPException as e:
+        # Malformed JSON (400) or wrong content type (415)
+        error = "Invalid JSON body" if e.code == 400 else e.description
+        return _respond('predict', {"error": error}, e.code, start)
+    metrics.observe('parse', perf_counter() - start)
+    body, status = handle_predict(data)
+    return _respond('predict', body, status, start)
+
+
+# --- 1b. BATCH API (many transactions, one model call) ---
+@api_bp.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    start = perf_counter()
+    data = request.get_json(silent=True)
+    metrics.observe('parse', perf_counter() - start)
+    body, status = handle_predict_batch(data, current_app.config['MAX_BATCH_ITEMS'])
+    return _respond('predict_batch', body, status, start)
+
+
+def _respond(endpoint, body, status, start):
+    serialize = perf_counter()
+    response = jsonify(body)
+    done = perf_counter()
+    metrics.observe('serialize', done - serialize)
+    metrics.request_done(endpoint, status, done - start)
+    return response, status
+
+
+# --- 1c. STREAMING API (NDJSON in, NDJSON out, for backfills) ---
+@api_bp.route('/predict/stream', methods=['POST'])
+def predict_stream():
+    if not fraud_service.ready.is_set():
+        return jsonify({"error": "Model not loaded"}), 503
+
+    # The body is read line by line while results are written back, so
+    # memory stays flat no matter how large the upload is
+    lines = read_lines(request.stream, current_app.config['STREAM_MAX_LINE_BYTES'])
+    records = score_ndjson(
+        lines,
+        fraud_service,
+        chunk_size=current_app.config['STREAM_CHUNK_SIZE'],
+        loads=current_app.json.loads,
+        dumps=current_app.json.dumps,
+    )
+    return Response(stream_with_context(records), mimetype='application/x-ndjson')
+
+
+@api_bp.route('/stats', methods=['GET'])
+def stats():
+    return jsonify({**fraud_service.stats(), "admission": admission.stats()}), 200
 
 
 # --- 2. THE NEW DASHBOARD (For Humans/Browser) ---
@@ -0,0 +1,83 @@
+from app.api.validation import parse_entities, parse_route, parse_transaction, parse_transaction_id
+
+
+def read_lines(stream, max_line_bytes):
+    """Yield (line_number, raw_line) from a binary stream, one line at a time.
+
+    Lines longer than max_line_bytes are yielded as None (and the rest of the
+    line is skipped) so one huge record cannot blow up memory.
+    """
+    number = 0
+    while True:
+        line = stream.readline(max_line_bytes + 1)
+        if not line:
+            return
+        number += 1
+        if len(line) > max_line_bytes and not line.endswith(b'\n'):
+            while line and not line.endswith(b'\n'):
+                line = stream.readline(max_line_bytes + 1)
+            yield number, None
+            continue
+        yield number, line
+
+
+def score_ndjson(lines, engine, chunk_size, loads, dumps):
+    """Score (line_number, raw_line) pairs in chunks and yield NDJSON output.
+
+    Every non-blank input line produces exactly one output record, in input
+    order: the usual prediction fields plus "line", or {"line", "error"}.
+    Only chunk_size rows are held at a time, whatever the input size.
+    """
+    pending = []        # output records for the current chunk, in order
+    rows, slots, entities, routes, transaction_ids = [], [], [], [], []
+    routed = engine.registry is not None
+
+    def flush():
+        nonlocal rows, slots, entities, routes, transaction_ids
+        scored = engine.predict_batch(
+            rows, entities, routes=routes if routed else None,
+            transaction_ids=transaction_ids if any(transaction_ids) else None,
+        )
+        for slot, result in zip(slots, scored):
+            pending[slot].update(result)
+        out = ''.join(dumps(record) + '\n' for record in pending)
+        pending.clear()
+        # Fresh lists rather than clear(): the audit log keeps the old ones
+        rows, slots, entities, routes, transaction_ids = [], [], [], [], []
+        return out
+
+    for number, raw in lines:
+        if raw is None:
+            pending.append({"line": number, "error": "Line too long"})
+        elif raw.strip():
+            record = {"line": number}
+            try:
+                item = loads(raw)
+            except ValueError as e:
+                record["error"] = f"Invalid JSON: {e}"
+            else:
+                row, error = parse_transaction(item)
+                if not error:
+                    transaction_id, error = parse_transaction_id(item)
+                if not error:
+                    ids, error = parse_entities(item)
+                route = None
+                if not error and routed:
+                    route, error = parse_route(item)
+                if error:
+                    record["error"] = error
+                else:
+                    if transaction_id is not None:
+                        record["transaction_id"] = transaction_id
+                    rows.append(row)
+                    entities.append(ids)
+                    routes.append(route)
+                    transaction_ids.append(transaction_id)
+                    slots.append(len(pending))
+            pending.append(record)
+
+        if len(rows) >= chunk_size or len(pending) >= 4 * chunk_size:
+            yield flush()
+
+    if pending:
+        yield flush()
@@ -0,0 +1,195 @@
+from itertools import repeat
+from operator import itemgetter
+
+import numpy as np
+
+MAX_TRANSACTION_ID_LENGTH = 128
+MAX_ENTITY_ID_LENGTH = 128
+MAX_ROUTE_LENGTH = 64
+
+# Optional ids used for velocity features, in FeatureStore order
+ENTITY_FIELDS = ('card_id', 'account_id', 'ip_address', 'merchant_id')
+
+# Optional routing key selecting a model from the registry
+ROUTING_FIELDS = ('segment', 'region')
+
+# JSON numbers decode to exactly these types; bool (a subclass of int) and
+# numeric strings are rejected rather than coerced
+NUMBER_TYPES = frozenset((int, float))
+
+
+class Field:
+    """One numeric input feature and its allowed (inclusive) range."""
+
+    def __init__(self, name, minimum, maximum):
+        self.name = name
+        self.minimum = minimum
+        self.maximum = maximum
+
+
+class Schema:
+    """A transaction schema, compiled once at import time.
+
+    Compiling turns the field list into a flat tuple of checks with their
+    error messages pre-rendered, plus min/max vectors for batch checks, so
+    validating a request does no lookups or string formatting on the happy
+    path. NaN and infinities fail the range check like any other
+    out-of-range value.
+    """
+
+    def __init__(self, fields):
+        self.fields = tuple(fields)
+        self.names = tuple(f.name for f in self.fields)
+        self.minimum = np.array([f.minimum for f in self.fields], dtype=np.float64)
+        self.maximum = np.array([f.maximum for f in self.fields], dtype=np.float64)
+        self._checks = tuple(
+            (
+                f.name, f.minimum, f.maximum,
+                f"Missing field '{f.name}'",
+                f"Field '{f.name}' must be a number",
+                f"Field '{f.name}' must be between {f.minimum:g} and {f.maximum:g}",
+            )
+            for f in self.fields
+        )
+
+    def parse(self, item):
+        """Turn one JSON transaction into a feature row.
+
+        Returns (row, None) on success or (None, error_message) so batch
+        callers can report problems per item instead of failing the request.
+        """
+        if not isinstance(item, dict):
+            return None, "Transaction must be a JSON object"
+
+        row = []
+        for name, minimum, maximum, missing, not_number, out_of_range in self._checks:
+            value = item.get(name)
+            if value is None:
+                return None, missing
+            if type(value) not in NUMBER_TYPES:
+                return None, not_number
+            if not minimum <= value <= maximum:
+                return None, out_of_range
+            row.append(float(value))
+        return row, None
+
+    def parse_many(self, items):
+        """Validate a list of transactions column by column.
+
+        Returns (features, positions, errors): a float64 matrix of the valid
+        rows in input order, the index of each of those rows in `items`, and
+        {index: error_message} for the rest.
+
+        The common case (every item a dict with plain numeric fields) costs
+        one C-level map() per column to gather it and one to collect its
+        types, then a vectorized range check. Only when something is off do we fall back
+        to parse() per item to find out which items failed and why.
+        """
+        try:
+            columns = [list(map(itemgetter(name), items)) for name in self.names]
+        except (KeyError, TypeError):
+            return self._parse_each(items)
+        for column in columns:
+            if not set(map(type, column)) <= NUMBER_TYPES:
+                return self._parse_each(items)
+        try:
+            features = np.array(columns, dtype=np.float64).T
+        except OverflowError:
+            return self._parse_each(items)
+
+        valid = ((features >= self.minimum) & (features <= self.maximum)).all(axis=1)
+        if valid.all():
+            return np.ascontiguousarray(features), range(len(items)), {}
+        errors = {int(i): self.parse(items[i])[1] for i in np.flatnonzero(~valid)}
+        return np.ascontiguousarray(features[valid]), np.flatnonzero(valid).tolist(), errors
+
+    def _parse_each(self, items):
+        rows, positions, errors = [], [], {}
+        for i, item in enumerate(items):
+            row, error = self.parse(item)
+            if error:
+                errors[i] = error
+            else:
+                rows.append(row)
+                positions.append(i)
+        features = np.array(rows, dtype=np.float64).reshape(-1, len(self.fields))
+        return features, positions, errors
+
+
+TRANSACTION_SCHEMA = Schema([
+    Field('amount', 0.0, 1e9),
+    Field('ip_risk', 0.0, 1.0),
+    Field('time', 0.0, 24.0),     # hour of day
+])
+FEATURES = TRANSACTION_SCHEMA.names
+
+parse_transaction = TRANSACTION_SCHEMA.parse
+
+
+def parse_transaction_id(item):
+    """Optional idempotency key: a non-empty string (or integer) id."""
+    value = item.get('transaction_id') if isinstance(item, dict) else None
+    if value is None:
+        return None, None
+    if isinstance(value, bool) or not isinstance(value, (str, int)):
+        return None, "Field 'transaction_id' must be a string"
+    value = str(value)
+    if not value or len(value) > MAX_TRANSACTION_ID_LENGTH:
+        return None, f"Field 'transaction_id' must be 1-{MAX_TRANSACTION_ID_LENGTH} characters"
+    return value, None
+
+
+def parse_entities(item):
+    """Optional entity ids as a (card, account, ip, merchant) tuple of str/None."""
+    ids = []
+    for name in ENTITY_FIELDS:
+        value = item.get(name)
+        if value is not None:
+            if isinstance(value, bool) or not isinstance(value, (str, int)):
+                return None, f"Field '{name}' must be a string"
+            value = str(value)
+            if not value or len(value) > MAX_ENTITY_ID_LENGTH:
+                return None, f"Field '{name}' must be 1-{MAX_ENTITY_ID_LENGTH} characters"
+        ids.append(value)
+    return tuple(ids), None
+
+
+def parse_entities_many(items):
+    """parse_entities() for a list of dicts, column by column.
+
+    Returns (entities, errors): one id tuple per item, or None when no item
+    carries any id, and {index: error_message} for items with bad ids.
+    """
+    if set(ENTITY_FIELDS).isdisjoint(set().union(*items)):
+        return None, {}
+    columns = [list(map(dict.get, items, repeat(name))) for name in ENTITY_FIELDS]
+    types = set()
+    for column in columns:
+        types |= set(map(type, column))
+    if types <= {str, type(None)} and not any('' in column for column in columns):
+        longest = max(max(map(len, filter(None, column)), default=0) for column in columns)
+        if longest <= MAX_ENTITY_ID_LENGTH:
+            return list(zip(*columns)), {}
+
+    entities, errors = [], {}
+    for i, item in enumerate(items):
+        ids, error = parse_entities(item)
+        if error:
+            errors[i] = error
+        entities.append(ids)
+    return entities, errors
+
+
+def parse_route(item):
+    """Optional (segment, region) routing key; a missing part is '*', no key is None."""
+    segment, region = item.get('segment'), item.get('region')
+    if segment is None and region is None:
+        return None, None
+    route = []
+    for name, value in zip(ROUTING_FIELDS, (segment, region)):
+        if value is None:
+            value = '*'
+        elif not isinstance(value, str) or not value or len(value) > MAX_ROUTE_LENGTH or '/' in value:
+            return None, f"Field '{name}' must be a string of 1-{MAX_ROUTE_LENGTH} characters without '/'"
+        route.append(value)
+    return tuple(route), None
@@ -0,0 +1,191 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from time import perf_counter
+
+from asgiref.wsgi import WsgiToAsgi
+
+from app import create_app
+from app.api.handlers import handle_predict, handle_predict_batch
+from app.services.admission import admission
+from app.services.metrics import metrics
+from app.services.profiler import profiler
+from config import config_by_name
+
+# _read_body's result when the client went away before the body was complete
+DISCONNECTED = object()
+
+# Werkzeug's 415 text when get_json() refuses a non-JSON content type
+NOT_JSON = "Did not attempt to load JSON data because the request Content-Type was not 'application/json'."
+
+
+class FraudASGI:
+    """ASGI front end for the fraud API.
+
+    The hot JSON endpoints (/predict and /predict/batch) are served natively.
+    Reading the body, decoding JSON and writing the response happen on the
+    event loop, and only validation + inference run on a bounded thread pool
+    (XGBoost releases the GIL while it predicts). A slow client therefore
+    costs a coroutine, not a worker thread. Every other route (dashboard,
+    streaming, stats, probes, admin) is delegated to the regular Flask app.
+
+    Responses match the Flask routes: /predict rejects bad JSON and
+    non-JSON content types like request.get_json(), /predict/batch parses
+    silently like get_json(silent=True). Admission control and the request
+    profiler apply here as they do in the Flask app.
+    """
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.json = flask_app.json
+        self.max_body = flask_app.config['ASGI_MAX_BODY_BYTES']
+        self.max_batch_items = flask_app.config['MAX_BATCH_ITEMS']
+        self.executor = ThreadPoolExecutor(
+            max_workers=flask_app.config['ASGI_INFERENCE_THREADS'],
+            thread_name_prefix='inference',
+        )
+        if not flask_app.config.get('ADMISSION_MAX_IN_FLIGHT'):
+            # The in-flight slot is taken on an inference thread
+            admission.max_in_flight = flask_app.config['ASGI_INFERENCE_THREADS']
+        self.fallback = WsgiToAsgi(flask_app)
+        # (method, path) -> (endpoint, handler, strict JSON parsing)
+        self.routes = {
+            ('POST', '/api/v1/predict'): ('predict', handle_predict, True),
+            ('POST', '/api/v1/predict/batch'): ('predict_batch', partial(
+                handle_predict_batch, max_items=self.max_batch_items
+            ), False),
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._lifespan(receive, send)
+
+        route = self.routes.get((scope.get('method'), scope.get('path')))
+        if scope['type'] != 'http' or route is None:
+            return await self.fallback(scope, receive, send)
+        endpoint, handler, strict = route
+
+        arrived = None
+        if admission.enabled and admission.request_start_header:
+            arrived = admission.arrival(self._header(scope, admission.request_start_header))
+        body = await self._read_body(receive)
+        if body is DISCONNECTED:
+            return   # nobody to answer; don't spend an inference slot on it
+        start = perf_counter()
+        if body is None:
+            return await self._respond(send, endpoint, {"error": "Request body too large"}, 413, start)
+        if strict and not self._is_json(self._header(scope, 'content-type')):
+            return await self._respond(send, endpoint, {"error": NOT_JSON}, 415, start)
+        try:
+            data = self.json.loads(body)
+        except ValueError:
+            if strict:
+                return await self._respond(send, endpoint, {"error": "Invalid JSON body"}, 400, start)
+            data = None
+        metrics.observe('parse', perf_counter() - start)
+
+        loop = asyncio.get_running_loop()
+        if profiler.enabled and profiler.sampled(self._header(scope, 'X-Profile'),
+                                                 self._header(scope, 'X-Admin-Token')):
+            handler = partial(self._profiled, handler)
+        if admission.enabled:
+            # The rate check is cheap and runs here; the in-flight slot is
+            # taken on the inference thread, so time spent queued for the
+            # pool counts towards the target queue delay
+            retry_after = admission.check_rate(self._client(scope))
+            if retry_after is not None:
+                body = {"error": "Rate limit exceeded", "retry_after": retry_after}
+                return await self._respond(send, endpoint, body, 429, start, retry_after)
+            handler = partial(self._admitted, handler, arrived or start, start)
+        result, status, *retry_after = await loop.run_in_executor(self.executor, handler, data)
+        await self._respond(send, endpoint, result, status, start, *retry_after)
+
+    @staticmethod
+    def _profiled(handler, data):
+        # Runs on the inference thread, which is where cProfile must be on
+        profile = profiler.start()
+        try:
+            return handler(data)
+        finally:
+            if profile is not None:
+                profiler.stop(profile)
+
+    @staticmethod
+    def _admitted(handler, arrived, received, data):
+        shed = admission.acquire(arrived, received)
+        if shed is not None:
+            return shed
+        try:
+            return handler(data)
+        finally:
+            admission.release()
+
+    def _client(self, scope):
+        client = self._header(scope, admission.client_header) if admission.client_header else None
+        if client:
+            return client
+        client = scope.get('client')
+        return client[0] if client else None
+
+    @staticmethod
+    def _is_json(content_type):
+        # Same test as werkzeug's Request.is_json
+        mimetype = (content_type or '').split(';')[0].strip().lower()
+        return mimetype == 'application/json' or (
+            mimetype.startswith('application/') and mimetype.endswith('+json')
+        )
+
+    @staticmethod
+    def _header(scope, name):
+        name = name.lower().encode()
+        for key, value in scope.get('headers', ()):
+            if key == name and value:
+                return value.decode('latin-1')
+        return None
+
+    async def _read_body(self, receive):
+        chunks, size = [], 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return DISCONNECTED
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if size > self.max_body:
+                return None
+            chunks.append(chunk)
+            if not message.get('more_body'):
+                return b''.join(chunks)
+
+    async def _respond(self, send, endpoint, body, status, start, retry_after=None):
+        serialize = perf_counter()
+        payload = self.json.dumpb(body)
+        done = perf_counter()
+        metrics.observe('serialize', done - serialize)
+        metrics.request_done(endpoint, status, done - start)
+        headers = [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(payload)).encode()),
+        ]
+        if retry_after is not None:
+            headers.append((b'retry-after', str(retry_after).encode()))
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': payload})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+def create_asgi_app(config_class=None):
+    # Same config selection as wsgi.py unless a class is passed
+    if config_class is None:
+        config_class = config_by_name[os.environ.get('FLASK_CONFIG', 'development')]
+    return FraudASGI(create_app(config_class))
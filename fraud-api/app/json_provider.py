@@ -0,0 +1,54 @@
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:     # optional speed-up; the stdlib json module is the fallback
+    orjson = None
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson, falling back to the stdlib.
+
+    orjson parses and serializes several times faster than `json` and
+    writes bytes directly, which the responses need anyway. It also
+    refuses NaN/Infinity literals on input, which the stdlib accepts.
+    With backend='stdlib' (or orjson not installed) this behaves exactly
+    like Flask's default provider.
+
+    dumpb() returns bytes; the ASGI app uses it to skip a str round trip.
+    """
+
+    sort_keys = False
+
+    def __init__(self, app, backend='auto'):
+        super().__init__(app)
+        if backend == 'orjson' and orjson is None:
+            raise RuntimeError("JSON_PROVIDER=orjson but orjson is not installed")
+        self.backend = 'orjson' if backend != 'stdlib' and orjson is not None else 'stdlib'
+        if self.backend == 'orjson':
+            self._options = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def dumps(self, obj, **kwargs):
+        if self.backend == 'stdlib' or kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._options).decode()
+
+    def dumpb(self, obj):
+        if self.backend == 'stdlib':
+            return super().dumps(obj).encode()
+        return orjson.dumps(obj, default=self.default, option=self._options)
+
+    def loads(self, s, **kwargs):
+        if self.backend == 'stdlib' or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if self.backend == 'stdlib':
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        options = self._options | orjson.OPT_APPEND_NEWLINE
+        if self.compact is None and self._app.debug or self.compact is False:
+            options |= orjson.OPT_INDENT_2
+        body = orjson.dumps(obj, default=self.default, option=options)
+        return self._app.response_class(body, mimetype=self.mimetype)
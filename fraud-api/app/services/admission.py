@@ -0,0 +1,222 @@
+import math
+import threading
+from collections import OrderedDict
+from time import perf_counter, time as wall_clock
+
+from flask import g, jsonify, request
+
+from app.services.metrics import metrics
+
+# Flask endpoints that go through admission control; probes, stats, admin
+# and the HTML dashboard are never shed
+ADMITTED_ENDPOINTS = frozenset(('api.predict', 'api.predict_batch', 'api.predict_stream'))
+
+# A request-start header older than this is taken as clock skew and ignored
+MAX_HEADER_AGE = 60.0
+
+
+class AdmissionController:
+    """Admission control and load shedding in front of the scoring endpoints.
+
+    Two checks, cheapest first:
+
+    1. Per-client token bucket (client = the ADMISSION_CLIENT_HEADER value,
+       else the remote address): ADMISSION_CLIENT_RATE requests/s with
+       bursts of ADMISSION_CLIENT_BURST. An empty bucket gets a 429 with
+       Retry-After set to when the next token is due. The header must be
+       one a trusted proxy sets: callers could otherwise pick a new id per
+       request. Behind a proxy without it all traffic shares one bucket.
+    2. Global in-flight limit: at most ADMISSION_MAX_IN_FLIGHT requests
+       score at once; others wait, up to ADMISSION_MAX_QUEUE of them, and
+       never longer than ADMISSION_TARGET_QUEUE_MS since they arrived. A
+       request that cannot start in time gets a 503 with Retry-After.
+       After such a timeout the queue is considered overloaded for one
+       target interval, and requests that find no free slot are shed
+       immediately instead of queueing: under overload most clients get a
+       fast 503 rather than a slow timeout, and the admitted ones keep a
+       bounded queue delay.
+
+    Requests are timed from when the proxy received them if it sends
+    ADMISSION_REQUEST_START_HEADER, so time spent in the server's accept
+    backlog and thread queue counts against the target too. That age only
+    decides the request's own fate: the overload window is opened only by
+    queueing measured here, so a forged or clock-skewed header cannot shed
+    other callers' requests.
+
+    Queue wait of admitted requests is recorded as the "queue_wait" stage;
+    admitted/shed counts are in fraud_admission_total and /stats. Nothing
+    is installed unless ADMISSION_ENABLED is set.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.client_header = None
+        self.client_rate = 100.0
+        self.client_burst = 200.0
+        self.max_clients = 10000
+        self.max_in_flight = 16
+        self.max_queue = 64
+        self.target_queue = 0.05
+        self.request_start_header = None
+
+        self._buckets = OrderedDict()   # client -> [tokens, last refill]
+        self._bucket_lock = threading.Lock()
+        self._cond = threading.Condition()
+        self.in_flight = 0
+        self.waiting = 0
+        self._overloaded_until = 0.0
+
+        self.admitted = 0
+        self.rate_limited = 0
+        self.overloaded = 0
+        self.max_wait = 0.0
+
+    def init_app(self, app):
+        self.enabled = app.config.get('ADMISSION_ENABLED', False)
+        self.client_header = app.config.get('ADMISSION_CLIENT_HEADER')
+        self.client_rate = app.config.get('ADMISSION_CLIENT_RATE', 100.0)
+        self.client_burst = app.config.get('ADMISSION_CLIENT_BURST', 200.0)
+        self.max_clients = app.config.get('ADMISSION_MAX_CLIENTS', 10000)
+        self.max_in_flight = app.config.get('ADMISSION_MAX_IN_FLIGHT') or app.config.get('SERVER_THREADS', 16)
+        self.max_queue = app.config.get('ADMISSION_MAX_QUEUE', 64)
+        self.target_queue = app.config.get('ADMISSION_TARGET_QUEUE_MS', 50.0) / 1000
+        self.request_start_header = app.config.get('ADMISSION_REQUEST_START_HEADER')
+        if self.enabled:
+            app.before_request(self._before)
+            app.teardown_request(self._teardown)
+
+    # --- Flask hooks ---
+    def _before(self):
+        if request.endpoint not in ADMITTED_ENDPOINTS:
+            return None
+        received = perf_counter()
+        arrived = self.arrival(request.headers.get(self.request_start_header) if self.request_start_header else None)
+        client = (request.headers.get(self.client_header) if self.client_header else None) or request.remote_addr
+        shed = self.admit(client, min(arrived, received), received)
+        if shed is None:
+            g._admitted = True
+            return None
+        body, status, retry_after = shed
+        metrics.request_done(request.endpoint.split('.')[-1], status, perf_counter() - arrived)
+        response = jsonify(body)
+        response.status_code = status
+        response.headers['Retry-After'] = str(retry_after)
+        return response
+
+    def _teardown(self, exc):
+        # Streamed responses tear down when the stream ends, so they hold
+        # their slot for as long as they are being scored
+        if g.pop('_admitted', False):
+            self.release()
+
+    # --- core, shared with the ASGI front end ---
+    def arrival(self, request_start=None):
+        """perf_counter() time the request arrived: now, or earlier per the
+        proxy's request-start header ("t=<unix time>" in s, ms or us)."""
+        now = perf_counter()
+        if not request_start:
+            return now
+        try:
+            stamp = float(request_start.strip().removeprefix('t='))
+        except ValueError:
+            return now
+        while stamp > 1e11:
+            stamp /= 1000   # ms or us since the epoch
+        age = wall_clock() - stamp
+        if not 0 < age < MAX_HEADER_AGE:
+            return now
+        return now - age
+
+    def admit(self, client, arrived, received=None):
+        """None if admitted (call release() when done), else (body, status, retry_after)."""
+        retry_after = self.check_rate(client)
+        if retry_after is not None:
+            return {"error": "Rate limit exceeded", "retry_after": retry_after}, 429, retry_after
+        return self.acquire(arrived, received)
+
+    def check_rate(self, client):
+        # None if the client has a token, else seconds until it will
+        now = perf_counter()
+        with self._bucket_lock:
+            bucket = self._buckets.get(client)
+            if bucket is None:
+                bucket = self._buckets[client] = [self.client_burst, now]
+                if len(self._buckets) > self.max_clients:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(client)
+                bucket[0] = min(self.client_burst, bucket[0] + (now - bucket[1]) * self.client_rate)
+                bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return None
+            self.rate_limited += 1
+            wait = (1 - bucket[0]) / self.client_rate
+        metrics.inc('admission_total', decision='rate_limited')
+        return max(1, math.ceil(wait))
+
+    def acquire(self, arrived, received=None):
+        # arrived: when the request arrived, possibly per the proxy's header;
+        # received: when this process saw it (default: arrived). Only time
+        # since `received` is trusted to open the overload window.
+        received = arrived if received is None else received
+        with self._cond:
+            now = perf_counter()
+            if now - arrived > self.target_queue:
+                # Already waited too long before reaching us (e.g. in the
+                # ASGI thread pool queue): shed at dequeue
+                return self._shed(now, mark=now - received > self.target_queue)
+            if self.in_flight >= self.max_in_flight:
+                if self.waiting >= self.max_queue or now < self._overloaded_until:
+                    return self._shed(now, mark=False)
+                deadline = arrived + self.target_queue
+                self.waiting += 1
+                try:
+                    while self.in_flight >= self.max_in_flight:
+                        now = perf_counter()
+                        remaining = deadline - now
+                        if remaining <= 0:
+                            return self._shed(now, mark=now - received > self.target_queue)
+                        self._cond.wait(remaining)
+                finally:
+                    self.waiting -= 1
+            self.in_flight += 1
+            self.admitted += 1
+            wait = perf_counter() - arrived
+            self.max_wait = max(self.max_wait, wait)
+        metrics.observe('queue_wait', wait)
+        metrics.inc('admission_total', decision='admitted')
+        return None
+
+    def _shed(self, now, mark=True):
+        # Called with _cond held
+        if mark:
+            self._overloaded_until = now + self.target_queue
+        self.overloaded += 1
+        metrics.inc('admission_total', decision='overloaded')
+        retry_after = max(1, math.ceil(self.target_queue))
+        return {"error": "Server overloaded, retry later", "retry_after": retry_after}, 503, retry_after
+
+    def release(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify()
+
+    def stats(self):
+        if not self.enabled:
+            return {"enabled": False}
+        return {
+            "enabled": True,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "max_in_flight": self.max_in_flight,
+            "target_queue_ms": round(self.target_queue * 1000, 3),
+            "admitted": self.admitted,
+            "shed": {"rate_limited": self.rate_limited, "overloaded": self.overloaded},
+            "max_queue_wait_ms": round(self.max_wait * 1000, 3),
+            "clients": len(self._buckets),
+        }
+
+
+# Process-wide admission controller
+admission = AdmissionController()
@@ -0,0 +1,416 @@
+import atexit
+import json
+import mmap
+import os
+import struct
+import threading
+from datetime import datetime, timezone
+from time import perf_counter, time as wall_clock
+
+import numpy as np
+
+from app.services.metrics import metrics
+
+# File layout: a sequence of self-describing blocks, one per flush, never
+# rewritten once written:
+#
+#   b'FAUDBLK1' | uint32 header length | JSON header | pad to 8 | columns
+#
+# The header holds the row count, the ts range of the block, the byte
+# offset and length of every column (relative to the end of the padded
+# header, each 8-byte aligned) and the value tables of category columns.
+# Numeric columns are raw little-endian arrays, so a reader can map them
+# straight out of an mmap. A block cut short by a crash (or still being
+# written) is ignored by readers.
+MAGIC = b'FAUDBLK1'
+SUFFIX = '.fcol'
+
+# name -> numpy dtype, 'category' (uint16 codes + value table in the header)
+# or 'str' (uint32 offsets + UTF-8 bytes; "" reads back as None)
+COLUMNS = (
+    ('ts', '<f8'),
+    ('amount', '<f8'),
+    ('ip_risk', '<f8'),
+    ('time', '<f8'),
+    ('fraud_probability', '<f4'),   # NaN when a rule decided
+    ('is_blocked', 'u1'),
+    ('latency_us', '<f4'),
+    ('risk_level', 'category'),
+    ('model_version', 'category'),
+    ('rule', 'category'),
+    ('transaction_id', 'str'),
+    ('card_id', 'str'),
+    ('account_id', 'str'),
+    ('ip_address', 'str'),
+    ('merchant_id', 'str'),
+)
+ENTITY_COLUMNS = ('card_id', 'account_id', 'ip_address', 'merchant_id')
+OVERFLOW_POLICIES = ('drop', 'block')
+
+
+def _align(n):
+    return (n + 7) & ~7
+
+
+def encode_block(columns):
+    # columns: name -> list or array of equal length, in COLUMNS order
+    rows = len(columns['ts'])
+    header = {"rows": rows, "ts_min": float(np.min(columns['ts'])), "ts_max": float(np.max(columns['ts'])),
+              "columns": {}}
+    buffers, offset = [], 0
+    for name, kind in COLUMNS:
+        values = columns[name]
+        if kind == 'category':
+            table, codes = {}, []
+            for v in values:
+                codes.append(table.setdefault(v, len(table)))
+            header["columns"][name] = {"kind": kind, "values": list(table)}
+            data = np.array(codes, dtype='<u2').tobytes()
+        elif kind == 'str':
+            encoded = [(v or '').encode() for v in values]
+            offsets = np.zeros(rows + 1, dtype='<u4')
+            np.cumsum([len(b) for b in encoded], out=offsets[1:])
+            header["columns"][name] = {"kind": kind, "data_offset": _align(offsets.nbytes)}
+            blob = offsets.tobytes()
+            data = blob + b'\0' * (_align(len(blob)) - len(blob)) + b''.join(encoded)
+        else:
+            header["columns"][name] = {"kind": kind}
+            data = np.asarray(values, dtype=kind).tobytes()
+        header["columns"][name].update(offset=offset, length=len(data))
+        buffers.append(data + b'\0' * (_align(len(data)) - len(data)))
+        offset += _align(len(data))
+    header["bytes"] = offset
+
+    head = json.dumps(header).encode()
+    prefix = MAGIC + struct.pack('<I', len(head)) + head
+    return b''.join([prefix, b'\0' * (_align(len(prefix)) - len(prefix))] + buffers)
+
+
+class AuditLog:
+    """Non-blocking, batched decision audit sink.
+
+    record() appends one entry per engine call (a whole batch at a time) to
+    an in-memory buffer under a short lock and returns. A background thread
+    wakes every flush_interval seconds, or as soon as flush_rows rows are
+    waiting, swaps the buffer out and encodes and appends it as one
+    columnar block, outside the lock: requests never wait for a write.
+
+    The buffer holds at most max_buffer_rows rows. When it is full,
+    overflow='drop' discards the new decisions and counts them
+    (dropped_rows, fraud_audit_dropped_total), while overflow='block' makes
+    the request wait for the flusher to free room, trading latency for a
+    complete log.
+
+    Files are append-only, named by creation time and pid (every pre-forked
+    worker writes its own), and rotate after rotate_bytes or rotate_seconds.
+    """
+
+    def __init__(self, directory, flush_rows=4096, flush_interval=1.0, max_buffer_rows=100000,
+                 overflow='drop', rotate_bytes=64 * 1024 * 1024, rotate_seconds=3600, fsync=True):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown audit overflow policy '{overflow}' (one of {', '.join(OVERFLOW_POLICIES)})")
+        self.directory = directory
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.max_buffer_rows = max_buffer_rows
+        self.overflow = overflow
+        self.rotate_bytes = rotate_bytes
+        self.rotate_seconds = rotate_seconds
+        self.fsync = fsync
+        os.makedirs(directory, exist_ok=True)
+
+        self._entries = []
+        self._rows = 0
+        self._cond = threading.Condition()
+        self._thread = None
+        self._pid = None
+        # Only touched by whoever holds _write_lock (the flusher, or close())
+        self._write_lock = threading.Lock()
+        self._file = None
+        self._file_opened = 0.0
+
+        self.written_rows = 0
+        self.dropped_rows = 0
+        self.blocked_waits = 0
+        self.flushes = 0
+        self.flush_seconds = 0.0
+        self.files = 0
+        self.errors = 0
+        self.lost_rows = 0
+        self.last_error = None
+        atexit.register(self.close)
+
+    def record(self, rows, results, latency, transaction_ids=None, entities=None):
+        # rows: n x (amount, ip_risk, time); results: the n decision dicts.
+        # Returns False if the entry was dropped.
+        n = len(results)
+        with self._cond:
+            if self._rows + n > self.max_buffer_rows and self._rows:
+                if self.overflow == 'drop':
+                    self.dropped_rows += n
+                    metrics.inc('audit_dropped_total', n)
+                    return False
+                self.blocked_waits += 1
+                self._cond.notify()
+                while self._rows and self._rows + n > self.max_buffer_rows:
+                    self._cond.wait()
+            self._entries.append((wall_clock(), latency, rows, results, transaction_ids, entities))
+            self._rows += n
+            if self._rows >= self.flush_rows:
+                self._cond.notify()
+        self._ensure_started()
+        return True
+
+    def _ensure_started(self):
+        # Threads do not survive fork(), so restart the flusher in each child
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._cond:
+            if self._thread is None or self._pid != os.getpid():
+                if self._pid is not None:
+                    self._file = None   # the parent's file stays the parent's
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name="audit-flusher", daemon=True)
+                self._thread.start()
+
+    def _take(self, wait):
+        with self._cond:
+            if wait and self._rows < self.flush_rows:
+                self._cond.wait(self.flush_interval)
+            entries, self._entries, self._rows = self._entries, [], 0
+            # Wake requests waiting for room (overflow='block')
+            self._cond.notify_all()
+        return entries
+
+    def _run(self):
+        while True:
+            entries = self._take(wait=True)
+            if entries:
+                self._write(entries)
+
+    def close(self):
+        # Final synchronous flush (atexit, or on shutdown)
+        entries = self._take(wait=False)
+        if entries:
+            self._write(entries)
+        with self._write_lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _columns(self, entries):
+        columns = {name: [] for name, _ in COLUMNS}
+        inputs, ts, latency = [], [], []
+        for when, took, rows, results, transaction_ids, entities in entries:
+            n = len(results)
+            inputs.append(np.asarray(rows, dtype=np.float64).reshape(n, 3))
+            ts.append(np.full(n, when))
+            latency.append(np.full(n, took * 1e6))
+            for result in results:
+                prob = result.get("fraud_probability")
+                columns['fraud_probability'].append(np.nan if prob is None else prob)
+                columns['is_blocked'].append(result.get("is_blocked", False))
+                columns['risk_level'].append(result.get("risk_level"))
+                columns['model_version'].append(result.get("model_version"))
+                columns['rule'].append(result.get("rule"))
+            columns['transaction_id'] += transaction_ids if transaction_ids is not None else [None] * n
+            ids = [ids or (None,) * 4 for ids in entities] if entities is not None else [(None,) * 4] * n
+            for name, values in zip(ENTITY_COLUMNS, zip(*ids)):
+                columns[name] += values
+        inputs = np.concatenate(inputs)
+        columns['amount'], columns['ip_risk'], columns['time'] = inputs[:, 0], inputs[:, 1], inputs[:, 2]
+        columns['ts'] = np.concatenate(ts)
+        columns['latency_us'] = np.concatenate(latency)
+        return columns
+
+    def _write(self, entries):
+        n = sum(len(entry[3]) for entry in entries)
+        start = perf_counter()
+        try:
+            block = encode_block(self._columns(entries))
+            with self._write_lock:
+                f = self._current_file(len(block))
+                f.write(block)
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+        except Exception as e:
+            self.errors += 1
+            self.lost_rows += n
+            self.last_error = f"{type(e).__name__}: {e}"
+            print(f"⚠️ Audit flush failed, {n} decisions lost ({self.last_error})")
+            return
+        self.flush_seconds += perf_counter() - start
+        self.flushes += 1
+        self.written_rows += n
+        metrics.inc('audit_rows_total', n)
+
+    def _current_file(self, incoming):
+        f = self._file
+        if f is not None and (
+            f.tell() + incoming > self.rotate_bytes
+            or wall_clock() - self._file_opened > self.rotate_seconds
+        ):
+            f.close()
+            f = None
+        if f is None:
+            stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%f')
+            path = os.path.join(self.directory, f"audit-{stamp}-{os.getpid()}{SUFFIX}")
+            f = self._file = open(path, 'ab')
+            self._file_opened = wall_clock()
+            self.files += 1
+        return f
+
+    def stats(self):
+        return {
+            "enabled": True,
+            "directory": self.directory,
+            "overflow": self.overflow,
+            "buffered_rows": self._rows,
+            "max_buffer_rows": self.max_buffer_rows,
+            "written_rows": self.written_rows,
+            "dropped_rows": self.dropped_rows,
+            "blocked_waits": self.blocked_waits,
+            "flushes": self.flushes,
+            "mean_flush_ms": round(self.flush_seconds / self.flushes * 1000, 3) if self.flushes else 0.0,
+            "files": self.files,
+            "errors": self.errors,
+            "lost_rows": self.lost_rows,
+            "last_error": self.last_error,
+        }
+
+
+class AuditReader:
+    """Memory-mapped queries over an audit directory.
+
+    Numeric columns are NumPy views straight into the mapped files (no
+    parsing, no copy for a single block); blocks entirely outside the
+    requested time range are skipped using the ts range in their header.
+    Safe to use while a server is still appending.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def files(self):
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory) if name.endswith(SUFFIX)
+        )
+
+    def blocks(self, since=None, until=None):
+        # Yields (header, mmap, data offset) for every complete block
+        for path in self.files():
+            yield from self._file_blocks(path, since, until)
+
+    @staticmethod
+    def _file_blocks(path, since=None, until=None):
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                return
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        pos = 0
+        while pos + len(MAGIC) + 4 <= size and mm[pos:pos + len(MAGIC)] == MAGIC:
+            (head_len,) = struct.unpack_from('<I', mm, pos + len(MAGIC))
+            head_end = pos + len(MAGIC) + 4 + head_len
+            if head_end > size:
+                break
+            header = json.loads(mm[pos + len(MAGIC) + 4:head_end])
+            data = _align(head_end)
+            if data + header["bytes"] > size:
+                break   # still being written
+            pos = data + header["bytes"]
+            if (since is not None and header["ts_max"] < since) or (until is not None and header["ts_min"] >= until):
+                continue
+            yield header, mm, data
+
+    @staticmethod
+    def _column(header, mm, data, name, rows=None):
+        # rows: optional row indices; only those are decoded
+        spec = header["columns"][name]
+        count, start = header["rows"], data + spec["offset"]
+        if spec["kind"] == 'category':
+            codes = np.frombuffer(mm, dtype='<u2', count=count, offset=start)
+            return np.array(spec["values"], dtype=object)[codes if rows is None else codes[rows]]
+        if spec["kind"] == 'str':
+            offsets = np.frombuffer(mm, dtype='<u4', count=count + 1, offset=start)
+            base = start + spec["data_offset"]
+            picked = range(count) if rows is None else rows.tolist()
+            return np.array(
+                [mm[base + offsets[i]:base + offsets[i + 1]].decode() or None for i in picked], dtype=object
+            )
+        column = np.frombuffer(mm, dtype=spec["kind"], count=count, offset=start)
+        return column if rows is None else column[rows]
+
+    def read(self, since=None, until=None, columns=None):
+        """Columns (name -> array) of all decisions with since <= ts < until."""
+        names = columns or [name for name, _ in COLUMNS]
+        parts = {name: [] for name in names}
+        for header, mm, data in self.blocks(since, until):
+            ts = self._column(header, mm, data, 'ts')
+            keep = None
+            if (since is not None and header["ts_min"] < since) or (until is not None and header["ts_max"] >= until):
+                keep = np.ones(len(ts), dtype=bool)
+                if since is not None:
+                    keep &= ts >= since
+                if until is not None:
+                    keep &= ts < until
+            for name in names:
+                column = self._column(header, mm, data, name)
+                parts[name].append(column if keep is None else column[keep])
+        return _concat(parts)
+
+    def tail(self, limit, since=None, until=None, columns=None):
+        """The last `limit` decisions with since <= ts < until, oldest first.
+
+        Only the newest blocks needed to fill `limit` are read, and string
+        columns are decoded for the returned rows only. Files last written
+        before `since` are skipped without being opened.
+        """
+        names = columns or [name for name, _ in COLUMNS]
+        found, newest = [], np.array([], dtype='<f8')
+        paths = [p for p in self.files() if since is None or os.path.getmtime(p) >= since]
+        headers = [block for path in paths for block in self._file_blocks(path, since, until)]
+        # Newest first. Blocks of several workers overlap in time, so stop
+        # only once a block cannot beat the oldest of the `limit` kept rows
+        for header, mm, data in sorted(headers, key=lambda block: block[0]["ts_max"], reverse=True):
+            if limit <= 0 or (len(newest) >= limit and header["ts_max"] < newest[0]):
+                break
+            ts = self._column(header, mm, data, 'ts')
+            keep = np.ones(len(ts), dtype=bool)
+            if since is not None:
+                keep &= ts >= since
+            if until is not None:
+                keep &= ts < until
+            rows = np.flatnonzero(keep)
+            found.append((header, mm, data, rows, ts[rows]))
+            newest = np.sort(np.concatenate([newest, ts[rows]]))[-limit:]
+        if not len(newest):
+            return _concat({name: [] for name in names})
+
+        # Newest `limit` rows across the blocks read, then decode just those
+        ts = np.concatenate([block[4] for block in found])
+        owner = np.repeat(np.arange(len(found)), [len(block[3]) for block in found])
+        index = np.concatenate([block[3] for block in found])
+        keep = np.argsort(ts, kind='stable')[-limit:]
+        parts, positions = {name: [] for name in names}, []
+        for b, (header, mm, data, _, _) in enumerate(found):
+            mine = keep[owner[keep] == b]
+            if not len(mine):
+                continue
+            positions.append(mine)
+            for name in names:
+                parts[name].append(self._column(header, mm, data, name, index[mine]))
+        order = np.argsort(ts[np.concatenate(positions)], kind='stable')
+        return {name: np.concatenate(chunks)[order] for name, chunks in parts.items()}
+
+
+def _concat(parts):
+    return {
+        name: (chunks[0] if len(chunks) == 1 else np.concatenate(chunks)) if chunks
+        else np.array([], dtype=object if dict(COLUMNS)[name] in ('category', 'str') else dict(COLUMNS)[name])
+        for name, chunks in parts.items()
+    }
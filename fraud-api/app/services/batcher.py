@@ -0,0 +1,117 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class QueueFullError(RuntimeError):
+    """Raised when the coalescing queue is at its configured depth."""
+
+
+class MicroBatcher:
+    """Coalesces concurrent single-row requests into one model call.
+
+    Callers get a Future back from submit(). A single worker thread collects
+    rows until either max_batch_size rows are waiting or max_wait_ms has
+    passed since the first one arrived, then scores them as one matrix with
+    score_fn(rows, key) and hands each caller its own row of the result.
+    Rows submitted with different keys (e.g. routed to different models)
+    share the queue and the wait but are scored in one call per key.
+    """
+
+    def __init__(self, score_fn, max_batch_size=64, max_wait_ms=2.0, max_queue=10000):
+        self.score_fn = score_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue(maxsize=max_queue)
+
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+        # Batch-size statistics (only touched by the worker thread)
+        self._batches = 0
+        self._rows = 0
+        self._max_seen = 0
+        self._size_buckets = [0] * (max(max_batch_size, 1).bit_length() + 1)
+        self._rejected = 0
+
+    def submit(self, row, key=None):
+        self._ensure_started()
+        future = Future()
+        try:
+            self._queue.put_nowait((row, key, future))
+        except queue.Full:
+            self._rejected += 1
+            raise QueueFullError("Prediction queue is full")
+        return future
+
+    def stats(self):
+        batches = self._batches
+        return {
+            "enabled": True,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "queue_depth": self._queue.qsize(),
+            "batches": batches,
+            "rows": self._rows,
+            "mean_batch_size": round(self._rows / batches, 2) if batches else 0.0,
+            "max_batch_size_seen": self._max_seen,
+            # bucket i counts batches of size in [2**(i-1), 2**i)
+            "batch_size_histogram": {
+                f"<{2 ** i}": count for i, count in enumerate(self._size_buckets) if count
+            },
+            "rejected": self._rejected,
+        }
+
+    # --- worker ---
+    def _ensure_started(self):
+        # Threads do not survive fork(), so restart the worker in each child
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+                self._thread.start()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            groups = {}
+            for item in batch:
+                groups.setdefault(item[1], []).append(item)
+            for key, group in groups.items():
+                rows = [row for row, _, _ in group]
+                try:
+                    scores = self.score_fn(np.asarray(rows, dtype=np.float64), key)
+                except Exception as e:
+                    for _, _, future in group:
+                        future.set_exception(e)
+                else:
+                    for (_, _, future), score in zip(group, scores):
+                        future.set_result(score)
+            self._record(len(batch))
+
+    def _record(self, size):
+        self._batches += 1
+        self._rows += size
+        self._max_seen = max(self._max_seen, size)
+        self._size_buckets[min(size.bit_length(), len(self._size_buckets) - 1)] += 1
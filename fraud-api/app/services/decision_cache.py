@@ -0,0 +1,121 @@
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from time import monotonic
+
+# Rough per-entry bookkeeping cost (OrderedDict node + tuple) on CPython
+_ENTRY_OVERHEAD = 160
+
+
+class DecisionCache:
+    """Remembers the decision returned for each transaction id.
+
+    Retries of the same id get the original answer back without running the
+    model again, even if a new model was swapped in meanwhile. Entries expire
+    after ttl seconds and the least recently used ones are evicted once the
+    estimated size goes over max_bytes. Concurrent requests for an id that
+    is still being scored wait for that first computation instead of
+    starting their own.
+    """
+
+    def __init__(self, ttl=300.0, max_bytes=64 * 1024 * 1024):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()   # id -> (expires_at, result, size)
+        self._pending = {}              # id -> Future for in-flight misses
+        self._lock = threading.Lock()
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get_or_compute(self, key, compute):
+        result, future = self.begin(key)
+        if result is not None:
+            return result
+        if future is not None:
+            return future.result()
+
+        try:
+            result = compute()
+        except Exception as e:
+            self.finish(key, error=e)
+            raise
+        self.finish(key, result)
+        return result
+
+    def begin(self, key):
+        """(result, None) on a hit, (None, future) if another caller is
+        computing it, (None, None) if the caller must compute it and then
+        call finish()."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1], None
+                self._drop(key)
+                self.expirations += 1
+
+            future = self._pending.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return None, future
+            self.misses += 1
+            self._pending[key] = Future()
+        return None, None
+
+    def finish(self, key, result=None, error=None):
+        with self._lock:
+            future = self._pending.pop(key)
+            # Errors ("Model not loaded", ...) are not decisions; let retries recompute
+            if error is None and 'error' not in result:
+                self._store(key, result)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def stats(self):
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "enabled": True,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    # --- internals (caller holds the lock) ---
+    def _store(self, key, result):
+        size = _estimate_size(key, result)
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = (monotonic() + self.ttl, result, size)
+        self._bytes += size
+        while self._bytes > self.max_bytes and self._entries:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self.evictions += 1
+
+    def _drop(self, key):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+
+def _estimate_size(key, result):
+    size = _ENTRY_OVERHEAD + sys.getsizeof(key) + sys.getsizeof(result)
+    for value in result.values():
+        size += sys.getsizeof(value)
+    return size
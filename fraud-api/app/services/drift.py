@@ -0,0 +1,338 @@
+import json
+import math
+import os
+import threading
+from time import time as wall_clock
+
+import numpy as np
+
+# Name of the output column sketched next to the input features
+PROBABILITY = 'fraud_probability'
+
+# Reference snapshot stored with a model artifact (<version>/drift_reference.json)
+REFERENCE_FILE = 'drift_reference.json'
+
+# Bucket layout, shared by every sketch so any two can be merged or
+# compared bucket by bucket: log-spaced buckets with 2% relative accuracy
+# for |x| in [MIN_VALUE, MAX_VALUE], one bucket for |x| < MIN_VALUE
+# (zero), mirrored for negative values. Values beyond MAX_VALUE land in
+# the outermost buckets.
+MIN_VALUE = 1e-4
+MAX_VALUE = 1e7
+RELATIVE_ACCURACY = 0.02
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+LOG_GAMMA = math.log(GAMMA)
+HALF_BINS = math.ceil(math.log(MAX_VALUE / MIN_VALUE) / LOG_GAMMA) + 1
+N_BINS = 2 * HALF_BINS + 1
+LAYOUT = [MIN_VALUE, MAX_VALUE, RELATIVE_ACCURACY]
+
+QUANTILES = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+
+# Fewer live rows than this and a column is never reported as drifted
+MIN_ROWS = 100
+
+# Scored rows are buffered and bucketed this many at a time: one
+# vectorized pass costs about as much as bucketing a single row on its own
+FOLD_ROWS = 256
+
+
+def bucket_index(values):
+    # Bucket of every value: negatives below HALF_BINS, zero at HALF_BINS,
+    # positives above, in increasing value order
+    magnitude = np.abs(values)
+    k = np.ceil(np.log(np.maximum(magnitude, MIN_VALUE) / MIN_VALUE) / LOG_GAMMA)
+    k = np.minimum(k, HALF_BINS - 1).astype(np.int64)
+    return np.where(
+        magnitude < MIN_VALUE, HALF_BINS, np.where(values > 0, HALF_BINS + 1 + k, HALF_BINS - 1 - k)
+    )
+
+
+def bucket_value(index):
+    # Representative value of a bucket, within RELATIVE_ACCURACY of
+    # everything in it
+    index = np.asarray(index)
+    k = np.abs(index - HALF_BINS) - 1
+    value = MIN_VALUE * GAMMA ** k * 2 / (GAMMA + 1)
+    return np.where(index == HALF_BINS, 0.0, np.sign(index - HALF_BINS) * value)
+
+
+class Sketch:
+    """Mergeable quantile sketch for a fixed set of columns.
+
+    One row of N_BINS bucket counts per column (a fixed-size log-scale
+    histogram) plus a missing (NaN) count. Updates cost O(1) per value and
+    memory never grows; two sketches merge by adding their counts, so
+    windows, workers and training chunks combine exactly.
+    """
+
+    def __init__(self, names):
+        self.names = tuple(names)
+        self.counts = np.zeros((len(self.names), N_BINS), dtype=np.int64)
+        self.missing = np.zeros(len(self.names), dtype=np.int64)
+        self.rows = 0
+
+    def update(self, matrix):
+        # matrix: rows x len(names); NaN counts as missing
+        matrix = np.asarray(matrix, dtype=np.float64)
+        present = ~np.isnan(matrix)
+        index = bucket_index(np.where(present, matrix, 0.0)) + np.arange(len(self.names)) * N_BINS
+        np.add.at(self.counts.reshape(-1), index[present], 1)
+        self.missing += len(matrix) - present.sum(axis=0)
+        self.rows += len(matrix)
+
+    def merge(self, other):
+        if other.names != self.names:
+            raise ValueError(f"Cannot merge sketches of {other.names} into {self.names}")
+        self.counts += other.counts
+        self.missing += other.missing
+        self.rows += other.rows
+        return self
+
+    def clear(self):
+        self.counts[:] = 0
+        self.missing[:] = 0
+        self.rows = 0
+
+    def summary(self, column):
+        counts = self.counts[column]
+        total = int(counts.sum())
+        out = {
+            "rows": total,
+            "missing_rate": round(int(self.missing[column]) / self.rows, 6) if self.rows else None,
+        }
+        if total:
+            ranks = np.array(QUANTILES) * (total - 1)
+            buckets = np.searchsorted(np.cumsum(counts), ranks, side='right')
+            for q, value in zip(QUANTILES, bucket_value(buckets)):
+                out[f"p{round(q * 100)}"] = round(float(value), 6)
+        return out
+
+    def to_dict(self):
+        # Only the non-empty bucket range of each column is stored
+        columns = {}
+        for name, counts in zip(self.names, self.counts):
+            nonzero = np.flatnonzero(counts)
+            if len(nonzero):
+                first, last = int(nonzero[0]), int(nonzero[-1])
+                columns[name] = [first, counts[first:last + 1].tolist()]
+        return {
+            "layout": LAYOUT,
+            "names": list(self.names),
+            "rows": self.rows,
+            "missing": self.missing.tolist(),
+            "columns": columns,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get('layout') != LAYOUT:
+            raise ValueError(f"Sketch layout {data.get('layout')} does not match {LAYOUT}")
+        sketch = cls(data['names'])
+        sketch.rows = int(data['rows'])
+        sketch.missing[:] = data['missing']
+        for name, (first, counts) in data['columns'].items():
+            sketch.counts[sketch.names.index(name), first:first + len(counts)] = counts
+        return sketch
+
+
+def compare(live, reference):
+    # (PSI over the reference's deciles, KS distance at bucket resolution)
+    live_total, ref_total = live.sum(), reference.sum()
+    if not live_total or not ref_total:
+        return None, None
+    live_cdf, ref_cdf = np.cumsum(live) / live_total, np.cumsum(reference) / ref_total
+    ks = float(np.max(np.abs(live_cdf - ref_cdf)))
+
+    edges = np.unique(np.searchsorted(ref_cdf, np.arange(1, 10) / 10, side='left') + 1)
+    starts = np.concatenate([[0], edges[edges < N_BINS]])
+    p = np.maximum(np.add.reduceat(reference, starts) / ref_total, 1e-4)
+    q = np.maximum(np.add.reduceat(live, starts) / live_total, 1e-4)
+    psi = float(np.sum((q - p) * np.log(q / p)))
+    return round(psi, 6), round(ks, 6)
+
+
+class DriftMonitor:
+    """Live feature and probability distributions vs the model's reference.
+
+    Scored rows go into the current slot of a ring of `slots` sketches,
+    each covering window_seconds / slots; the live window is the merge of
+    the slots that are still inside the window, so old traffic ages out
+    without any per-row bookkeeping. update() only appends to a buffer of
+    at most FOLD_ROWS rows, which is folded into the slot in one pass.
+
+    Each worker process has its own monitor. With a shared `directory`, a
+    background thread writes this worker's window there every
+    snapshot_seconds, and reports merge the fresh snapshots of all workers.
+    The reference is the sketch stored with the model artifact
+    (REFERENCE_FILE, written by train.py from the holdout set, or from live
+    traffic via save_reference()).
+    """
+
+    def __init__(self, names, window_seconds=3600.0, slots=12, directory=None,
+                 snapshot_seconds=10.0, psi_threshold=0.2):
+        self.names = tuple(names) + (PROBABILITY,)
+        self.window_seconds = window_seconds
+        self.slot_seconds = window_seconds / slots
+        self.directory = directory
+        self.snapshot_seconds = snapshot_seconds
+        self.psi_threshold = psi_threshold
+
+        self._slots = [Sketch(self.names) for _ in range(slots)]
+        self._epochs = [None] * slots
+        self._epoch = None              # slot the buffered rows belong to
+        self._pending = []              # (features, probs) not yet folded in
+        self._pending_rows = 0
+        self._lock = threading.Lock()
+        self._references = {}           # model version -> Sketch or None
+        self._thread = None
+        self._pid = None
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def update(self, features, probs):
+        epoch = int(wall_clock() // self.slot_seconds)
+        with self._lock:
+            if epoch != self._epoch:
+                self._fold()
+                self._epoch = epoch
+            self._pending.append((features, probs))
+            self._pending_rows += len(probs)
+            if self._pending_rows >= FOLD_ROWS:
+                self._fold()
+        if self.directory:
+            self._ensure_started()
+
+    def _fold(self):
+        # Caller holds the lock
+        if not self._pending:
+            return
+        i = self._epoch % len(self._slots)
+        if self._epochs[i] != self._epoch:
+            self._slots[i].clear()
+            self._epochs[i] = self._epoch
+        features = np.vstack([f for f, _ in self._pending])
+        probs = np.concatenate([p for _, p in self._pending])
+        self._slots[i].update(np.column_stack([features, probs]))
+        self._pending, self._pending_rows = [], 0
+
+    def window(self):
+        # This process's live window
+        oldest = int(wall_clock() // self.slot_seconds) - len(self._slots) + 1
+        merged = Sketch(self.names)
+        with self._lock:
+            self._fold()
+            for epoch, sketch in zip(self._epochs, self._slots):
+                if epoch is not None and epoch >= oldest:
+                    merged.merge(sketch)
+        return merged
+
+    def merged(self):
+        # (live window of all workers, number of workers merged)
+        merged, workers = self.window(), 1
+        if not self.directory:
+            return merged, workers
+        fresh_after = wall_clock() - max(3 * self.snapshot_seconds, 60)
+        own = self._snapshot_path()
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if not name.startswith('drift-') or not name.endswith('.json') or path == own:
+                continue
+            try:
+                with open(path) as f:
+                    snapshot = json.load(f)
+                if snapshot['written_at'] < fresh_after:
+                    continue    # a worker that has exited
+                merged.merge(Sketch.from_dict(snapshot['sketch']))
+            except (OSError, ValueError, KeyError):
+                continue
+            workers += 1
+        return merged, workers
+
+    # --- reference snapshots stored with the artifacts ---
+    def reference(self, model):
+        if model.version not in self._references:
+            path = os.path.join(os.path.dirname(model.path), REFERENCE_FILE)
+            sketch = None
+            if os.path.exists(path):
+                with open(path) as f:
+                    sketch = Sketch.from_dict(json.load(f))
+            self._references[model.version] = sketch
+        return self._references[model.version]
+
+    def save_reference(self, model, min_rows=MIN_ROWS):
+        # Make the current live window (all workers) the model's reference
+        live, workers = self.merged()
+        if live.rows < min_rows:
+            raise ValueError(f"Only {live.rows} live rows, need at least {min_rows} for a reference")
+        path = os.path.join(os.path.dirname(model.path), REFERENCE_FILE)
+        tmp = f"{path}.tmp-{os.getpid()}"
+        with open(tmp, 'w') as f:
+            json.dump(live.to_dict(), f)
+        os.replace(tmp, path)
+        self._references[model.version] = live
+        return {"model_version": model.version, "path": path, "rows": live.rows, "workers": workers}
+
+    def report(self, model):
+        live, workers = self.merged()
+        reference = self.reference(model)
+        columns, drifted = {}, []
+        for i, name in enumerate(live.names):
+            entry = {"live": live.summary(i)}
+            if reference is not None and name in reference.names:
+                j = reference.names.index(name)
+                entry["reference"] = reference.summary(j)
+                entry["psi"], entry["ks"] = compare(live.counts[i], reference.counts[j])
+                entry["drifted"] = bool(
+                    entry["psi"] is not None and entry["live"]["rows"] >= MIN_ROWS
+                    and entry["psi"] > self.psi_threshold
+                )
+                if entry["drifted"]:
+                    drifted.append(name)
+            columns[name] = entry
+        return {
+            "model_version": model.version,
+            "reference_rows": reference.rows if reference is not None else None,
+            "window_seconds": self.window_seconds,
+            "workers": workers,
+            "live_rows": live.rows,
+            "psi_threshold": self.psi_threshold,
+            "drifted": drifted,
+            "columns": columns,
+        }
+
+    # --- cross-worker snapshots ---
+    def _snapshot_path(self):
+        return os.path.join(self.directory, f"drift-{os.getpid()}.json") if self.directory else None
+
+    def _ensure_started(self):
+        # Threads do not survive fork(), so start the writer in each child
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name="drift-snapshots", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        event = threading.Event()
+        while not event.wait(self.snapshot_seconds):
+            try:
+                self.write_snapshot()
+            except OSError as e:
+                print(f"⚠️ Drift snapshot failed ({e})")
+
+    def write_snapshot(self):
+        path = self._snapshot_path()
+        tmp = f"{path}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump({"written_at": wall_clock(), "pid": os.getpid(), "sketch": self.window().to_dict()}, f)
+        os.replace(tmp, path)
+
+    def stats(self):
+        return {
+            "enabled": True,
+            "window_seconds": self.window_seconds,
+            "live_rows": self.window().rows,
+            "snapshot_dir": self.directory,
+        }
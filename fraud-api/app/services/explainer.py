@@ -0,0 +1,77 @@
+import threading
+from collections import OrderedDict
+
+from app.api.validation import FEATURES
+
+
+class Explainer:
+    """Per-feature contributions for scored rows, on request only.
+
+    Uses the booster's native pred_contribs output (exact TreeSHAP): for
+    each row, one value per feature plus a bias, in log-odds, that add up
+    to the row's margin. All rows of a call that aren't cached go through
+    one booster call. Results are cached per (model version, feature row)
+    in an LRU of max_entries rows, so a newly deployed version never
+    serves stale explanations and repeated inputs cost a dict lookup.
+    """
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._cache = OrderedDict()     # (version, row bytes) -> explanation
+        self._names = {}                # version -> feature names
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.calls = 0
+
+    def _feature_names(self, model):
+        names = self._names.get(model.version)
+        if names is None:
+            names = model.meta.get('features') or []
+            if len(names) != model.n_features:
+                names = list(FEATURES) + [f"f{i}" for i in range(len(FEATURES), model.n_features)]
+            names = self._names[model.version] = tuple(names[:model.n_features])
+        return names
+
+    def explain(self, model, features):
+        # features: the (rows x model.n_features) matrix the model scored
+        keys = [(model.version, row.tobytes()) for row in features]
+        out = [None] * len(keys)
+        with self._lock:
+            for i, key in enumerate(keys):
+                cached = self._cache.get(key)
+                if cached is not None:
+                    self._cache.move_to_end(key)
+                    out[i] = cached
+        missing = [i for i, cached in enumerate(out) if cached is None]
+        self.hits += len(keys) - len(missing)
+        if not missing:
+            return out
+
+        import xgboost as xgb
+        names = self._feature_names(model)
+        contribs = model.model.get_booster().predict(
+            xgb.DMatrix(features[missing]), pred_contribs=True
+        )
+        self.calls += 1
+        self.misses += len(missing)
+        with self._lock:
+            for i, row in zip(missing, contribs.tolist()):
+                out[i] = {
+                    "base_value": round(row[-1], 4),
+                    "contributions": {name: round(v, 4) for name, v in zip(names, row)},
+                }
+                self._cache[keys[i]] = out[i]
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return out
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "booster_calls": self.calls,
+        }
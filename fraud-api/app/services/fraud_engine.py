@@ -1,33 +1,560 @@
-import joblib
-import numpy as np
 import os
+import threading
+from time import perf_counter, sleep
+
+import numpy as np
+
+from app.api.validation import FEATURES
+from app.services.audit import AuditLog
+from app.services.batcher import MicroBatcher
+from app.services.decision_cache import DecisionCache
+from app.services.drift import DriftMonitor
+from app.services.explainer import Explainer
+from app.services.feature_store import FeatureStore
+from app.services.metrics import metrics
+from app.services.model_registry import ModelRegistry
+from app.services.model_store import (
+    ARTIFACTS_DIR, LoadedModel, load_model, read_meta, resolve_model,
+)
+from app.services.rules import RuleSet
+from app.services.shadow import ShadowScorer
+from app.services.tree_eval import TreeEnsemble
+
+# Probability above which a transaction is blocked
+BLOCK_THRESHOLD = 0.7
 
 class FraudEngine:
-    def __init__(self):
-        # Robust path finding for the model
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        model_path = os.path.join(base_dir, '../models/artifacts/model.pkl')
-        
+    def __init__(self, model_dir=ARTIFACTS_DIR, model_version=None):
+        # Versioned artifacts live in model_dir; model_version pins one,
+        # None means "newest"
+        self.model_dir = model_dir
+        self.model_version = model_version
+
+        # The model currently serving traffic. Replaced as a whole on reload;
+        # readers take one reference per call and never see a mix.
+        self.active = None
+
+        # Startup state, reported by /readyz
+        self.ready = threading.Event()
+        self.loading = False
+        self.load_error = None
+        self.startup = {}
+        self._created = perf_counter()
+        self._load_lock = threading.Lock()
+        self._watcher = None
+        self.reloads = 0
+
+        # Optional coalescing layer for single-row predictions
+        self.batcher = None
+        # Idempotency: transaction_id -> original decision
+        self.decision_cache = None
+        # Optional NumPy tree walker used instead of the sklearn wrapper for
+        # batches up to native_max_batch rows (XGBoost's threaded C++ wins
+        # on bigger ones)
+        self.backend = 'xgboost'
+        self.native_max_batch = 128
+        # XGBoost threads per process (None = library default, all cores)
+        self.nthread = None
+        # Per-entity velocity features appended after the 3 base features
+        self.feature_store = None
+        # Optional rule cascade that can decide a row without the model
+        self.rules = None
+        # Candidate models scored in the background on live traffic
+        self.shadow = None
+        # Append-only decision log, written by a background thread
+        self.audit = None
+        # Per-feature contributions, only computed for explain=True calls
+        self.explainer = Explainer()
+        # Extra models picked per request by (segment, region), lazily loaded
+        self.registry = None
+        # Live feature/probability distributions, compared to the artifact's
+        self.drift = None
+
+    @property
+    def model(self):
+        active = self.active
+        return active.model if active else None
+
+    def init_app(self, app):
+        self.native_max_batch = app.config.get('NATIVE_MAX_BATCH', 128)
+        self.nthread = app.config.get('XGB_NTHREAD') or None
+        backend = app.config.get('INFERENCE_BACKEND', 'xgboost')
+        self.model_dir = app.config.get('MODEL_DIR') or self.model_dir
+        self.model_version = app.config.get('MODEL_VERSION') or self.model_version
+
+        if app.config.get('BATCHING_ENABLED'):
+            self.batcher = MicroBatcher(
+                self._score_batch,
+                max_batch_size=app.config['BATCH_MAX_SIZE'],
+                max_wait_ms=app.config['BATCH_MAX_WAIT_MS'],
+                max_queue=app.config['BATCH_MAX_QUEUE'],
+            )
+        else:
+            self.batcher = None
+
+        if app.config.get('DECISION_CACHE_ENABLED', True):
+            self.decision_cache = DecisionCache(
+                ttl=app.config['DECISION_CACHE_TTL'],
+                max_bytes=app.config['DECISION_CACHE_MAX_BYTES'],
+            )
+        else:
+            self.decision_cache = None
+
+        if app.config.get('VELOCITY_ENABLED', True):
+            self.feature_store = FeatureStore(
+                windows=app.config['VELOCITY_WINDOWS'],
+                max_entities=app.config['VELOCITY_MAX_ENTITIES'],
+                slots=app.config['VELOCITY_SLOTS'],
+            )
+        else:
+            self.feature_store = None
+
+        rules_file = app.config.get('RULES_FILE')
+        self.rules = RuleSet.from_file(rules_file) if rules_file else None
+
+        self.explainer = Explainer(max_entries=app.config.get('EXPLAIN_CACHE_ENTRIES', 10000))
+
+        # An explicitly configured registry must exist; the default one is optional
+        registry_file = app.config.get('MODEL_REGISTRY') or os.path.join(self.model_dir, 'registry.json')
+        if app.config.get('MODEL_REGISTRY') or os.path.exists(registry_file):
+            self.registry = ModelRegistry.from_file(
+                self._prepare, registry_file,
+                max_bytes=app.config.get('MODEL_REGISTRY_MAX_BYTES', 256 * 1024 * 1024),
+                primary=lambda: self.active.version if self.active else None,
+            )
+        else:
+            self.registry = None
+
+        audit_dir = app.config.get('AUDIT_DIR')
+        if audit_dir and (self.audit is None or self.audit.directory != audit_dir):
+            self.audit = AuditLog(
+                audit_dir,
+                flush_rows=app.config['AUDIT_FLUSH_ROWS'],
+                flush_interval=app.config['AUDIT_FLUSH_INTERVAL'],
+                max_buffer_rows=app.config['AUDIT_MAX_BUFFER_ROWS'],
+                overflow=app.config['AUDIT_OVERFLOW'],
+                rotate_bytes=app.config['AUDIT_ROTATE_BYTES'],
+                rotate_seconds=app.config['AUDIT_ROTATE_SECONDS'],
+                fsync=app.config['AUDIT_FSYNC'],
+            )
+        elif not audit_dir:
+            self.audit = None
+
+        if app.config.get('DRIFT_ENABLED', True):
+            store_names = list(self.feature_store.names) if self.feature_store else []
+            self.drift = DriftMonitor(
+                list(FEATURES) + store_names,
+                window_seconds=app.config['DRIFT_WINDOW_SECONDS'],
+                slots=app.config['DRIFT_SLOTS'],
+                directory=app.config.get('DRIFT_DIR'),
+                snapshot_seconds=app.config['DRIFT_SNAPSHOT_SECONDS'],
+                psi_threshold=app.config['DRIFT_PSI_THRESHOLD'],
+            )
+        else:
+            self.drift = None
+
+        shadow_versions = app.config.get('SHADOW_VERSIONS') or []
+        self.shadow = None
+        if shadow_versions:
+            self.shadow = ShadowScorer(
+                BLOCK_THRESHOLD,
+                max_queue_rows=app.config['SHADOW_MAX_QUEUE_ROWS'],
+                batch_rows=app.config['SHADOW_BATCH_ROWS'],
+            )
+
+        if self.active is not None:
+            if backend != self.backend:
+                self.backend = backend
+                self.reload(self.active.version)
+        else:
+            self.backend = backend
+            if app.config.get('MODEL_BACKGROUND_LOAD', True):
+                self.load_async()
+            else:
+                self.load()
+
+        if shadow_versions:
+            if app.config.get('MODEL_BACKGROUND_LOAD', True):
+                threading.Thread(
+                    target=self._load_shadow, args=(shadow_versions,), name="shadow-loader", daemon=True
+                ).start()
+            else:
+                self._load_shadow(shadow_versions)
+
+        if app.config.get('MODEL_WATCH_INTERVAL', 0) > 0:
+            self.watch(app.config['MODEL_WATCH_INTERVAL'])
+
+    # --- LOADING ---
+    def load(self):
+        # Load, build the chosen backend and warm it; only then report ready
+        if self.ready.is_set():
+            return True
+        self.loading = True
+        try:
+            with self._load_lock:
+                start = perf_counter()
+                candidate = self._prepare(self.model_version)
+                done = perf_counter()
+                self.active = candidate
+        except Exception as e:
+            self.load_error = f"{type(e).__name__}: {e}"
+            print(f"❌ ERROR: Could not load model ({self.load_error}). Run training script first!")
+            return False
+        finally:
+            self.loading = False
+
+        self.startup = {
+            "model_version": candidate.version,
+            "model_path": candidate.path,
+            "load_ms": round((done - start) * 1000, 1),
+            "cold_start_ms": round((done - self._created) * 1000, 1),
+        }
+        self.load_error = None
+        self.ready.set()
+        print(f"✅ Model {candidate.version} loaded and warmed from {candidate.path} "
+              f"in {self.startup['load_ms']} ms (cold start {self.startup['cold_start_ms']} ms)")
+        return True
+
+    def load_async(self):
+        # Keep create_app() fast: the model loads while the server starts
+        if self.ready.is_set() or self.loading:
+            return
+        self.loading = True
+        threading.Thread(target=self.load, name="model-loader", daemon=True).start()
+
+    def reload(self, version=None):
+        # Build and warm the new model off the request path, then swap it in
+        # with a single reference assignment. In-flight calls finish on the
+        # model they started with; new calls pick up the new one.
+        with self._load_lock:
+            start = perf_counter()
+            candidate = self._prepare(version or self.model_version)
+            previous = self.active
+            self.active = candidate
+            self.reloads += 1
+            self.load_error = None
+            self.ready.set()
+
+        took = round((perf_counter() - start) * 1000, 1)
+        old = previous.version if previous else None
+        print(f"🔄 Model swapped {old} -> {candidate.version} ({took} ms)")
+        return {"previous_version": old, "model_version": candidate.version, "reload_ms": took}
+
+    def reload_rules(self, path=None):
+        # Compile the new rule file completely before swapping it in, so a
+        # bad edit leaves the current rules serving
+        path = path or (self.rules.source if self.rules else None)
+        if not path:
+            raise ValueError("No rules file configured (RULES_FILE)")
+        self.rules = RuleSet.from_file(path)
+        return {"source": path, "rules": len(self.rules.rules)}
+
+    def set_shadow(self, versions):
+        # Load and warm every candidate before swapping the set in; an
+        # empty list turns shadow scoring off
+        candidates = [self._prepare(v) for v in versions]
+        if self.shadow is None:
+            if not candidates:
+                return {"candidates": []}
+            self.shadow = ShadowScorer(BLOCK_THRESHOLD)
+        self.shadow.set_candidates(candidates)
+        return {"candidates": [c.version for c in candidates]}
+
+    def _load_shadow(self, versions):
         try:
-            self.model = joblib.load(model_path)
-            print("✅ Model loaded successfully from", model_path)
-        except FileNotFoundError:
-            print(f"❌ ERROR: Model not found at {model_path}. Run training script first!")
-            self.model = None
-
-    def predict(self, amount, ip_risk, time):
-        if not self.model:
+            self.set_shadow(versions)
+            print(f"👥 Shadow scoring with {', '.join(versions)}")
+        except Exception as e:
+            print(f"⚠️ Shadow models not loaded ({type(e).__name__}: {e})")
+
+    def reload_registry(self):
+        # Re-read the routes; models already loaded stay resident
+        if self.registry is None:
+            raise ValueError("No model registry configured (MODEL_REGISTRY or <MODEL_DIR>/registry.json)")
+        self.registry.reload()
+        return {"source": self.registry.source, "routes": len(self.registry.routes)}
+
+    def drift_report(self):
+        if self.drift is None:
+            raise ValueError("Drift monitoring is disabled (DRIFT_ENABLED)")
+        if self.active is None:
+            raise ValueError("Model not loaded")
+        return self.drift.report(self.active)
+
+    def save_drift_reference(self):
+        # Store the live window as the active version's reference snapshot
+        if self.drift is None:
+            raise ValueError("Drift monitoring is disabled (DRIFT_ENABLED)")
+        if self.active is None:
+            raise ValueError("Model not loaded")
+        return self.drift.save_reference(self.active)
+
+    def after_fork(self):
+        # Called in each pre-forked worker: the model pages are inherited
+        # copy-on-write from the master, but its threads are not
+        if self._watcher is not None:
+            interval, self._watcher = self._watch_interval, None
+            self.watch(interval)
+
+    def watch(self, interval):
+        # Poll the artifacts dir and reload when a newer version shows up
+        if self._watcher is not None:
+            return
+        self._watch_interval = interval
+        self._watcher = threading.Thread(
+            target=self._watch_loop, args=(interval,), name="model-watcher", daemon=True
+        )
+        self._watcher.start()
+
+    def _watch_loop(self, interval):
+        last_seen = None
+        while True:
+            sleep(interval)
+            if self.model_version:
+                continue  # pinned: only explicit reloads change the model
+            try:
+                latest, _ = resolve_model(self.model_dir)
+                active = self.active
+                if latest != last_seen and (active is None or latest != active.version):
+                    self.reload()
+                last_seen = latest
+            except Exception as e:
+                print(f"⚠️ Model watcher: reload failed ({type(e).__name__}: {e})")
+
+    def _prepare(self, version=None):
+        version, path = resolve_model(self.model_dir, version)
+        model = load_model(path)
+        if self.nthread:
+            model.set_params(n_jobs=self.nthread)
+
+        evaluator = None
+        if self.backend == 'native':
+            try:
+                evaluator = TreeEnsemble.from_booster(model.get_booster())
+            except ValueError as e:
+                print(f"⚠️ Native evaluator unavailable ({e}), using predict_proba")
+
+        meta = read_meta(path)
+        n_features = int(getattr(model, 'n_features_in_', 3))
+        if n_features > 3:
+            # Trained on velocity features: they must match what we compute
+            wanted = tuple(meta.get('features', ())[3:])
+            store = self.feature_store
+            if store is None or wanted != store.names[:len(wanted)] or len(wanted) != n_features - 3:
+                provided = list(store.names) if store else 'none'
+                raise ValueError(f"Model {version} expects features {list(wanted)}, "
+                                 f"the feature store provides {provided}")
+
+        candidate = LoadedModel(version, path, model, evaluator, meta, n_features)
+        # First calls pay for lazy allocations and thread pools; do it now
+        dummy = np.zeros((1, n_features))
+        model.predict_proba(dummy)
+        if evaluator is not None:
+            evaluator.predict_proba(dummy)
+        return candidate
+
+    # --- SCORING ---
+    def predict(self, amount, ip_risk, time, transaction_id=None, entities=None, explain=False, route=None):
+        # entities: optional (card, account, ip, merchant) ids for velocity;
+        # explain=True adds per-feature contributions to model decisions;
+        # route: optional (segment, region) key for the model registry
+        if not self.ready.is_set():
             return {"error": "Model not loaded"}
-            
-        features = np.array([[amount, ip_risk, time]])
-        prob = self.model.predict_proba(features)[0][1]
-        is_fraud = prob > 0.7
-        
+
+        start = perf_counter()
+        if transaction_id is not None and self.decision_cache is not None:
+            # Retries of the same transaction get the original decision back
+            # (and are not counted again by the velocity features)
+            result = self.decision_cache.get_or_compute(
+                transaction_id, lambda: self._predict_one(amount, ip_risk, time, entities, explain, route)
+            )
+        else:
+            result = self._predict_one(amount, ip_risk, time, entities, explain, route)
+        if self.audit is not None:
+            self.audit.record(
+                ((amount, ip_risk, time),), (result,), perf_counter() - start, (transaction_id,), (entities,)
+            )
+        return result
+
+    def _predict_one(self, amount, ip_risk, time, entities=None, explain=False, route=None):
+        # Explained calls skip the batcher: they are rare and need the
+        # features the model saw
+        if self.batcher is not None and not explain:
+            row = self._features([[amount, ip_risk, time]], [entities])[0]
+            if self.rules is not None:
+                decision = self.rules.decide(row[None, :], [entities])[0]
+                if decision is not None:
+                    return decision
+            model = self.registry.model_for(route) if self.registry is not None else None
+            return self.batcher.submit(row, model).result()
+
+        return self._decide([[amount, ip_risk, time]], [entities], explain, [route])[0]
+
+    def predict_batch(self, rows, entities=None, explain=False, routes=None, transaction_ids=None):
+        # rows: list of [amount, ip_risk, time], entities: None or one id
+        # tuple (or None) per row. One predict_proba call for the whole
+        # matrix, results come back in the same order. transaction_ids:
+        # None or one id (or None) per row, deduplicated like predict()'s.
+        if not self.ready.is_set():
+            return [{"error": "Model not loaded"} for _ in rows]
+        if len(rows) == 0:
+            return []
+
+        start = perf_counter()
+        if transaction_ids is not None and self.decision_cache is not None:
+            results = self._decide_once(rows, entities, explain, routes, transaction_ids)
+        else:
+            results = self._decide(rows, entities, explain, routes)
+        if self.audit is not None:
+            self.audit.record(rows, results, perf_counter() - start, transaction_ids, entities)
+        return results
+
+    def _decide_once(self, rows, entities, explain, routes, transaction_ids):
+        # Rows whose transaction id was already decided (or is being decided
+        # by another request) get that decision; the rest are scored together
+        cache = self.decision_cache
+        results = [None] * len(rows)
+        owned, waiting = [], []
+        for i, key in enumerate(transaction_ids):
+            if key is None:
+                owned.append(i)
+                continue
+            result, future = cache.begin(key)
+            if result is not None:
+                results[i] = result
+            elif future is not None:
+                waiting.append((i, future))
+            else:
+                owned.append(i)
+
+        if owned:
+            pick = lambda values: [values[i] for i in owned] if values is not None else None
+            try:
+                scored = self._decide(pick(rows), pick(entities), explain, pick(routes))
+            except Exception as e:
+                for i in owned:
+                    if transaction_ids[i] is not None:
+                        cache.finish(transaction_ids[i], error=e)
+                raise
+            for i, result in zip(owned, scored):
+                results[i] = result
+                if transaction_ids[i] is not None:
+                    cache.finish(transaction_ids[i], result)
+
+        # Duplicates within this batch were claimed above, so they resolve here
+        for i, future in waiting:
+            results[i] = future.result()
+        return results
+
+    def _decide(self, rows, entities=None, explain=False, routes=None):
+        start = perf_counter()
+        features = self._features(rows, entities)
+        metrics.observe('features', perf_counter() - start)
+        registry = self.registry if routes is not None else None
+        if self.rules is None and registry is None:
+            return self._score_rows(features, explain)
+
+        # Rules first; only the rows no rule decided go to the model
+        if self.rules is not None:
+            start = perf_counter()
+            results = self.rules.decide(features, entities)
+            metrics.observe('rules', perf_counter() - start)
+            pending = [i for i, result in enumerate(results) if result is None]
+        else:
+            results, pending = [None] * len(features), list(range(len(features)))
+        if not pending:
+            return results
+
+        # One model call per routed model (None = the primary model)
+        groups, models = {}, {}
+        for i in pending:
+            route = routes[i] if registry is not None else None
+            if route not in models:
+                models[route] = registry.model_for(route) if route is not None else None
+            groups.setdefault(models[route], []).append(i)
+        for model, rows_for_model in groups.items():
+            scored = self._score_rows(features[rows_for_model], explain, model)
+            for i, result in zip(rows_for_model, scored):
+                results[i] = result
+        return results
+
+    def _features(self, rows, entities=None):
+        features = np.asarray(rows, dtype=np.float64).reshape(-1, 3)
+        store = self.feature_store
+        if store is None:
+            return features
+
+        # Velocity block, NaN (= missing to the trees) for rows without ids.
+        # Always computed while the store is on, so its state is warm when a
+        # model trained on these features is deployed.
+        velocity = np.full((len(features), len(store.names)), np.nan)
+        if entities is not None:
+            for i, ids in enumerate(entities):
+                if ids is not None:
+                    velocity[i] = store.features(ids, features[i, 0])
+        return np.hstack([features, velocity])
+
+    def stats(self):
+        active = self.active
+        return {
+            "model_version": active.version if active else None,
+            "reloads": self.reloads,
+            "backend": "native" if active and active.evaluator is not None else "xgboost",
+            "batching": self.batcher.stats() if self.batcher else {"enabled": False},
+            "decision_cache": self.decision_cache.stats() if self.decision_cache else {"enabled": False},
+            "velocity": self.feature_store.stats() if self.feature_store else {"enabled": False},
+            "rules": self.rules.stats() if self.rules else {"enabled": False},
+            "shadow": self.shadow.stats() if self.shadow else {"enabled": False},
+            "audit": self.audit.stats() if self.audit else {"enabled": False},
+            "explain": self.explainer.stats(),
+            "registry": self.registry.stats() if self.registry else {"enabled": False},
+            "drift": self.drift.stats() if self.drift else {"enabled": False},
+        }
+
+    def _score_batch(self, features, model):
+        # MicroBatcher callback: rows coalesced for one model
+        return self._score_rows(features, model=model)
+
+    def _score_rows(self, features, explain=False, model=None):
+        # model: a registry model, or None for the primary one
+        active = model or self.active
+        scored = features
+        if features.shape[1] != active.n_features:
+            # Velocity columns the active model wasn't trained on
+            scored = features[:, :active.n_features]
+        start = perf_counter()
+        probs = active.predict_proba(scored, self.native_max_batch)
+        metrics.observe('model', perf_counter() - start)
+        if self.shadow is not None and model is None:
+            # Non-blocking hand-off: candidates see the full feature vector
+            self.shadow.offer(features, probs)
+        if self.drift is not None and model is None:
+            # Primary model only: its probabilities are what the reference holds
+            start = perf_counter()
+            self.drift.update(features, probs)
+            metrics.observe('drift', perf_counter() - start)
+
+        blocked = int(np.count_nonzero(probs > BLOCK_THRESHOLD))
+        metrics.inc('decisions_total', blocked, decision='blocked')
+        metrics.inc('decisions_total', len(probs) - blocked, decision='normal')
+        results = [self._format(prob, active.version) for prob in probs]
+        if explain:
+            start = perf_counter()
+            for result, explanation in zip(results, self.explainer.explain(active, scored)):
+                result["explanation"] = explanation
+            metrics.observe('explain', perf_counter() - start)
+        return results
+
+    @staticmethod
+    def _format(prob, version):
+        is_fraud = prob > BLOCK_THRESHOLD
+
         return {
             "fraud_probability": round(float(prob), 4),
             "is_blocked": bool(is_fraud),
-            "risk_level": "CRITICAL" if is_fraud else "NORMAL"
+            "risk_level": "CRITICAL" if is_fraud else "NORMAL",
+            "model_version": version,
         }
 
-# Singleton instance
+# Singleton instance (the model is loaded by init_app, not at import)
 fraud_service = FraudEngine()
@@ -0,0 +1,125 @@
+import threading
+from bisect import bisect_left
+
+# Upper bounds (seconds) of the latency histogram buckets; +Inf is implicit
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+)
+
+
+class _Shard:
+    # Everything one thread has recorded. Only that thread ever writes it.
+    def __init__(self):
+        self.histograms = {}    # stage -> [bucket counts..., +Inf count, sum]
+        self.counters = {}      # (name, labels) -> value
+
+
+class Metrics:
+    """Request metrics with per-thread shards.
+
+    Recording never takes a lock: every thread writes to its own shard
+    (threading.local), so the hot path cannot contend with other requests.
+    A scrape walks all shards and sums them; it may miss a sample recorded
+    mid-scrape, which Prometheus-style counters tolerate. Shards of threads
+    that have exited are folded into one retired shard at scrape time, so
+    servers that start a thread per request don't accumulate shards.
+
+    Values are per process. Under pre-forked servers each worker reports
+    its own numbers.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._local = threading.local()
+        self._shards = {}               # thread -> its shard
+        self._retired = _Shard()        # totals of threads that have exited
+        self._register_lock = threading.Lock()
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = _Shard()
+            with self._register_lock:   # once per thread
+                self._shards[threading.current_thread()] = shard
+        return shard
+
+    def _retire_dead(self):
+        # A dead thread never writes again, so its shard can be merged
+        with self._register_lock:
+            dead = [thread for thread in self._shards if not thread.is_alive()]
+            for thread in dead:
+                shard = self._shards.pop(thread)
+                for stage, hist in shard.histograms.items():
+                    total = self._retired.histograms.setdefault(stage, [0] * len(hist[:-1]) + [0.0])
+                    for i, value in enumerate(hist):
+                        total[i] += value
+                for key, value in shard.counters.items():
+                    self._retired.counters[key] = self._retired.counters.get(key, 0) + value
+
+    def observe(self, stage, seconds):
+        histograms = self._shard().histograms
+        hist = histograms.get(stage)
+        if hist is None:
+            hist = histograms[stage] = [0] * (len(self.buckets) + 1) + [0.0]
+        hist[bisect_left(self.buckets, seconds)] += 1
+        hist[-1] += seconds
+
+    def inc(self, name, value=1, **labels):
+        counters = self._shard().counters
+        key = (name, tuple(sorted(labels.items())))
+        counters[key] = counters.get(key, 0) + value
+
+    def request_done(self, endpoint, status, seconds):
+        self.observe('request', seconds)
+        self.inc('requests_total', endpoint=endpoint)
+        if status >= 400:
+            self.inc('errors_total', endpoint=endpoint, status=status)
+
+    # --- scraping ---
+    def collect(self):
+        self._retire_dead()
+        histograms, counters = {}, {}
+        with self._register_lock:
+            shards = [self._retired, *self._shards.values()]
+        for shard in shards:
+            for stage, hist in list(shard.histograms.items()):
+                total = histograms.setdefault(stage, [0] * len(hist[:-1]) + [0.0])
+                for i, value in enumerate(hist):
+                    total[i] += value
+            for key, value in list(shard.counters.items()):
+                counters[key] = counters.get(key, 0) + value
+        return histograms, counters
+
+    def render(self, prefix='fraud'):
+        # Prometheus text exposition format (version 0.0.4)
+        histograms, counters = self.collect()
+        name = f"{prefix}_stage_latency_seconds"
+        lines = [
+            f"# HELP {name} Time spent in each stage of the prediction path.",
+            f"# TYPE {name} histogram",
+        ]
+        for stage in sorted(histograms):
+            hist = histograms[stage]
+            cumulative = 0
+            for bound, count in zip(self.buckets, hist):
+                cumulative += count
+                lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            cumulative += hist[len(self.buckets)]
+            lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {cumulative}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {hist[-1]:.6f}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {cumulative}')
+
+        seen = set()
+        for (counter, labels), value in sorted(counters.items()):
+            full = f"{prefix}_{counter}"
+            if full not in seen:
+                seen.add(full)
+                lines.append(f"# TYPE {full} counter")
+            label_text = ','.join(f'{k}="{v}"' for k, v in labels)
+            lines.append(f"{full}{{{label_text}}} {value}" if label_text else f"{full} {value}")
+        return '\n'.join(lines) + '\n'
+
+
+# Process-wide registry
+metrics = Metrics()
@@ -0,0 +1,183 @@
+import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from time import monotonic, perf_counter
+
+from app.services.metrics import metrics
+
+# Seconds before a version that failed to load is tried again
+RETRY_FAILED_AFTER = 30.0
+
+# Registry file format (<MODEL_DIR>/registry.json, see registry.example.json):
+#
+#   {"routes": {"retail/eu": "20261016-120000",
+#               "travel/*":  "20261016-130000",
+#               "*/us":      "20261016-140000"}}
+#
+# Requests carry an optional "segment" and "region". The most specific
+# route wins: "segment/region", then "segment/*", then "*/region". Anything
+# unrouted is scored by the engine's primary model.
+
+
+def read_routes(path):
+    with open(path) as f:
+        data = json.load(f)
+    if not isinstance(data, dict) or not isinstance(data.get('routes'), dict):
+        raise ValueError("Registry must be {\"routes\": {\"segment/region\": \"version\", ...}}")
+    return data['routes']
+
+
+def estimate_bytes(loaded):
+    # Serialized booster size plus the native evaluator's arrays: a rough
+    # but stable proxy for what the model keeps resident
+    size = len(loaded.model.get_booster().save_raw(raw_format='ubj'))
+    evaluator = loaded.evaluator
+    if evaluator is not None:
+        size += sum(getattr(evaluator, name).nbytes for name in (
+            'feature', 'threshold', 'left', 'default_left', 'value', 'roots'
+        ))
+    return size
+
+
+class ModelRegistry:
+    """Maps request routing keys to model versions, loaded on first use.
+
+    Loaded models sit in an LRU bounded by an estimated total size
+    (max_bytes); the least recently used ones are dropped to make room and
+    simply load again when next routed to. Loading goes through the same
+    prepare step as the primary model (backend, feature checks, warm-up),
+    once per version even when many requests ask for it at the same time.
+    A version that fails to load falls back to the primary model and is
+    retried after RETRY_FAILED_AFTER seconds.
+    """
+
+    def __init__(self, prepare, routes=None, source=None, max_bytes=256 * 1024 * 1024, primary=None):
+        # primary: returns the primary model's version; routes to it reuse
+        # the primary model instead of loading a second copy
+        self.prepare = prepare
+        self.primary = primary
+        self.source = source
+        self.max_bytes = max_bytes
+        self.routes = {}
+        self.set_routes(routes or {})
+
+        self._models = OrderedDict()    # version -> (LoadedModel, bytes)
+        self._loading = {}              # version -> Future
+        self._failed = {}               # version -> (retry at, error)
+        self._lock = threading.Lock()
+        self.resident_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.load_seconds = 0.0
+        self.max_load_seconds = 0.0
+        self.load_errors = 0
+        self.last_error = None
+        self.evictions = 0
+
+    @classmethod
+    def from_file(cls, prepare, path, max_bytes=256 * 1024 * 1024, primary=None):
+        return cls(prepare, read_routes(path), source=path, max_bytes=max_bytes, primary=primary)
+
+    def reload(self):
+        # Re-read the routes from source; resident models stay loaded
+        self.set_routes(read_routes(self.source))
+
+    def set_routes(self, routes):
+        for key, version in routes.items():
+            segment, sep, region = key.partition('/')
+            if not sep or not segment or not region or not isinstance(version, str) or not version:
+                raise ValueError(f"Bad registry route {key!r} -> {version!r} (want \"segment/region\": \"version\")")
+        self.routes = dict(routes)
+
+    def resolve(self, segment, region):
+        # Version for a request, or None for the primary model
+        routes = self.routes
+        return (
+            routes.get(f"{segment}/{region}")
+            or routes.get(f"{segment}/*")
+            or routes.get(f"*/{region}")
+        )
+
+    def model_for(self, route):
+        # route: (segment, region) or None. Returns a LoadedModel, or None
+        # for the primary model.
+        if route is None:
+            return None
+        version = self.resolve(*route)
+        if version is None or (self.primary is not None and version == self.primary()):
+            return None
+        with self._lock:
+            entry = self._models.get(version)
+            if entry is not None:
+                self._models.move_to_end(version)
+                self.hits += 1
+                metrics.inc('registry_lookups_total', result='hit')
+                return entry[0]
+            failed = self._failed.get(version)
+            if failed is not None and failed[0] > monotonic():
+                return None
+            future = self._loading.get(version)
+            owner = future is None
+            if owner:
+                self.misses += 1
+                future = self._loading[version] = Future()
+        metrics.inc('registry_lookups_total', result='miss')
+        if not owner:
+            return future.result()
+        return self._load(version, future)
+
+    def _load(self, version, future):
+        start = perf_counter()
+        try:
+            loaded = self.prepare(version)
+            size = estimate_bytes(loaded)
+        except Exception as e:
+            with self._lock:
+                self._loading.pop(version, None)
+                self._failed[version] = (monotonic() + RETRY_FAILED_AFTER, f"{type(e).__name__}: {e}")
+                self.load_errors += 1
+                self.last_error = f"{version}: {type(e).__name__}: {e}"
+            print(f"⚠️ Registry model {version} failed to load ({type(e).__name__}: {e}), using the primary model")
+            future.set_result(None)
+            return None
+
+        took = perf_counter() - start
+        with self._lock:
+            self._loading.pop(version, None)
+            self._failed.pop(version, None)
+            self._models[version] = (loaded, size)
+            self.resident_bytes += size
+            while self.resident_bytes > self.max_bytes and len(self._models) > 1:
+                _, (_, dropped) = self._models.popitem(last=False)
+                self.resident_bytes -= dropped
+                self.evictions += 1
+            self.loads += 1
+            self.load_seconds += took
+            self.max_load_seconds = max(self.max_load_seconds, took)
+        metrics.observe('model_load', took)
+        future.set_result(loaded)
+        return loaded
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "enabled": True,
+            "source": self.source,
+            "routes": len(self.routes),
+            "resident_models": len(self._models),
+            "resident_versions": list(self._models),
+            "resident_bytes": self.resident_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "loads": self.loads,
+            "mean_load_ms": round(self.load_seconds / self.loads * 1000, 1) if self.loads else 0.0,
+            "max_load_ms": round(self.max_load_seconds * 1000, 1),
+            "evictions": self.evictions,
+            "load_errors": self.load_errors,
+            "last_error": self.last_error,
+        }
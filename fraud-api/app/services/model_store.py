@@ -0,0 +1,136 @@
+import json
+import os
+import shutil
+from datetime import datetime, timezone
+
+# Default location of trained artifacts (fraud-api/app/models/artifacts)
+ARTIFACTS_DIR = os.path.abspath(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '../models/artifacts')
+)
+
+# Native formats first; model.pkl is only read for older artifacts
+MODEL_FILES = ('model.ubj', 'model.json', 'model.pkl')
+
+# Version reported for a model file sitting directly in the artifacts dir
+UNVERSIONED = 'unversioned'
+
+# Layout:
+#   artifacts/<version>/model.ubj   one directory per trained model
+#   artifacts/<version>/meta.json   optional metadata (metrics, ...)
+#   artifacts/<version>/drift_reference.json
+#                                   optional feature distribution snapshot
+# Version names sort chronologically, so the newest one is max(versions).
+
+
+class LoadedModel:
+    """One loaded, ready-to-score model version.
+
+    Never mutated after construction: the engine swaps whole LoadedModel
+    objects, so a request that grabbed one keeps a consistent model.
+    """
+
+    def __init__(self, version, path, model, evaluator=None, meta=None, n_features=3):
+        self.version = version
+        self.path = path
+        self.model = model
+        self.evaluator = evaluator
+        self.meta = meta or {}
+        # Width of the feature vector the model was trained on
+        self.n_features = n_features
+
+    def predict_proba(self, features, native_max_batch=0):
+        if self.evaluator is not None and len(features) <= native_max_batch:
+            return self.evaluator.predict_proba(features)
+        return self.model.predict_proba(features)[:, 1]
+
+
+def find_model_file(directory=ARTIFACTS_DIR):
+    for name in MODEL_FILES:
+        path = os.path.join(directory, name)
+        if os.path.exists(path):
+            return path
+    raise FileNotFoundError(f"No model ({', '.join(MODEL_FILES)}) found in {directory}")
+
+
+def list_versions(directory=ARTIFACTS_DIR):
+    if not os.path.isdir(directory):
+        return []
+    versions = []
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if name.startswith('.') or not os.path.isdir(path):
+            continue
+        if any(os.path.exists(os.path.join(path, f)) for f in MODEL_FILES):
+            versions.append(name)
+    return sorted(versions)
+
+
+def resolve_model(directory=ARTIFACTS_DIR, version=None):
+    # Returns (version, model file path); newest version unless one is pinned
+    if version and (os.sep in version or '/' in version or version.startswith('.')):
+        raise ValueError(f"Invalid model version '{version}'")
+    if version and version != UNVERSIONED:
+        return version, find_model_file(os.path.join(directory, version))
+    versions = list_versions(directory)
+    if versions and version != UNVERSIONED:
+        return versions[-1], find_model_file(os.path.join(directory, versions[-1]))
+    return UNVERSIONED, find_model_file(directory)
+
+
+def load_model(path):
+    # xgboost/joblib are imported here rather than at module level: importing
+    # them takes about a second, and that should happen on the loader thread,
+    # not inside create_app()
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Model not found at {path}")
+    if path.endswith('.pkl'):
+        import joblib
+        return joblib.load(path)
+
+    # Native format: no pickle, and portable across XGBoost versions
+    import xgboost as xgb
+    model = xgb.XGBClassifier()
+    model.load_model(path)
+    return model
+
+
+def read_meta(model_path):
+    path = os.path.join(os.path.dirname(model_path), 'meta.json')
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def new_version(directory=ARTIFACTS_DIR):
+    version = datetime.now(timezone.utc).strftime('%Y%m%d-%H%M%S')
+    candidate, n = version, 1
+    while os.path.exists(os.path.join(directory, candidate)):
+        candidate = f"{version}-{n}"
+        n += 1
+    return candidate
+
+
+def save_model(model, directory=ARTIFACTS_DIR, version=None, meta=None, fmt='ubj', files=None):
+    # Written into a hidden temp dir and renamed into place, so a watcher
+    # never sees a half-written version. files: extra {name: text} to store
+    # alongside (e.g. the drift reference)
+    os.makedirs(directory, exist_ok=True)
+    version = version or new_version(directory)
+    final_dir = os.path.join(directory, version)
+    tmp_dir = os.path.join(directory, f'.tmp-{version}')
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    model.save_model(os.path.join(tmp_dir, f'model.{fmt}'))
+    meta = dict(meta or {})
+    meta.setdefault('version', version)
+    meta.setdefault('created_at', datetime.now(timezone.utc).isoformat())
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=2)
+    for name, text in (files or {}).items():
+        with open(os.path.join(tmp_dir, name), 'w') as f:
+            f.write(text)
+
+    os.rename(tmp_dir, final_dir)
+    return version, os.path.join(final_dir, f'model.{fmt}')
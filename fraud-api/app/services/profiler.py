@@ -0,0 +1,112 @@
+import cProfile
+import hmac
+import io
+import pstats
+import random
+import threading
+
+from flask import g, request
+
+# Held while a request is being profiled. Only one cProfile profiler can be
+# active per process (Python 3.12+ raises on a second enable()), so a
+# sampled request that finds it taken is simply not profiled.
+_profiling = threading.Lock()
+
+
+class RequestProfiler:
+    """Samples live requests with cProfile and aggregates the results.
+
+    Nothing is installed unless PROFILING_ENABLED is set, so a disabled
+    profiler costs nothing at all. When enabled, a PROFILE_SAMPLE_RATE
+    fraction of requests is profiled, plus any request that sends
+    `X-Profile: 1` with a valid admin token. The stats from every profiled
+    request are merged into one pstats report, which the admin API serves.
+
+    cProfile follows the request thread only: with micro-batching on, the
+    model call runs on the batcher thread and won't appear in the report.
+    The ASGI front end samples its native endpoints the same way and
+    profiles them on the inference thread (validation + scoring).
+    One request is profiled at a time; sampled requests that overlap it are
+    skipped (counted in `skipped`).
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.sample_rate = 0.0
+        self.admin_token = None
+        self.requests = 0
+        self.skipped = 0
+        self._stats = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.enabled = app.config.get('PROFILING_ENABLED', False)
+        self.sample_rate = app.config.get('PROFILE_SAMPLE_RATE', 0.0)
+        self.admin_token = app.config.get('ADMIN_TOKEN')
+        if self.enabled:
+            app.before_request(self._before)
+            app.teardown_request(self._teardown)
+
+    def sampled(self, profile_header=None, admin_token=None):
+        """Whether to profile a request with these X-Profile / X-Admin-Token values."""
+        if random.random() < self.sample_rate:
+            return True
+        if profile_header != '1' or not self.admin_token:
+            return False
+        return hmac.compare_digest(admin_token or '', self.admin_token)
+
+    def start(self):
+        # Profiles the calling thread; None if another request holds the profiler
+        if not _profiling.acquire(blocking=False):
+            self.skipped += 1
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler (not ours) is active in this process
+            _profiling.release()
+            self.skipped += 1
+            return None
+        return profile
+
+    def stop(self, profile):
+        profile.disable()
+        _profiling.release()
+        with self._lock:
+            if self._stats is None:
+                self._stats = pstats.Stats(profile)
+            else:
+                self._stats.add(profile)
+            self.requests += 1
+
+    # --- Flask hooks ---
+    def _before(self):
+        if self.sampled(request.headers.get('X-Profile'), request.headers.get('X-Admin-Token')):
+            g._profile = self.start()
+
+    def _teardown(self, exc):
+        profile = g.pop('_profile', None)
+        if profile is not None:
+            self.stop(profile)
+
+    def report(self, sort='cumulative', limit=40):
+        with self._lock:
+            if self._stats is None:
+                return f"No profiled requests yet (enabled={self.enabled}, sample_rate={self.sample_rate})\n"
+            out = io.StringIO()
+            self._stats.stream = out
+            out.write(f"Aggregated over {self.requests} profiled requests "
+                      f"({self.skipped} sampled requests skipped while another was profiled)\n")
+            self._stats.sort_stats(sort).print_stats(limit)
+            return out.getvalue()
+
+    def reset(self):
+        with self._lock:
+            self._stats = None
+            self.requests = 0
+            self.skipped = 0
+
+
+# Process-wide profiler
+profiler = RequestProfiler()
@@ -0,0 +1,245 @@
+import json
+import operator
+
+import numpy as np
+
+from app.api.validation import ENTITY_FIELDS, FEATURES
+from app.services.metrics import metrics
+
+# Fields a rule can test, in the order of the record tuple built per row
+RULE_FIELDS = FEATURES + ENTITY_FIELDS
+NUMERIC_FIELDS = frozenset(FEATURES)
+ACTIONS = ('allow', 'block')
+
+COMPARISONS = {
+    '<': operator.lt, '<=': operator.le, '>': operator.gt,
+    '>=': operator.ge, '==': operator.eq, '!=': operator.ne,
+}
+
+# Rule file format (JSON list, evaluated in order, first match decides):
+#
+#   [{"name": "denylisted_card", "action": "block",
+#     "when": {"field": "card_id", "op": "in", "value": ["c-1", "c-2"]}},
+#    {"name": "small_and_clean", "action": "allow",
+#     "when": {"all": [{"field": "amount", "op": "<", "value": 5},
+#                      {"field": "ip_risk", "op": "<", "value": 0.1}]}}]
+#
+# Conditions: {"field", "op", "value"} with op one of < <= > >= == !=,
+# "between" ([lo, hi], inclusive), "in" / "not_in" (list); combined with
+# {"all": [...]}, {"any": [...]} and {"not": {...}}. Entity id fields
+# only support == != in not_in.
+
+# Batches at least this big are evaluated column-wise with NumPy
+VECTOR_MIN_ROWS = 16
+
+
+def _compile(cond, rule):
+    # Turns one condition into two predicates: a closure over one record
+    # tuple (single rows) and a function of whole columns returning a bool
+    # mask (batches). All the lookups (field index, operator, set building)
+    # happen here, once.
+    if not isinstance(cond, dict):
+        raise ValueError(f"Rule '{rule}': condition must be an object")
+    if 'all' in cond or 'any' in cond:
+        key = 'all' if 'all' in cond else 'any'
+        parts = tuple(_compile(c, rule) for c in cond[key])
+        if not parts:
+            raise ValueError(f"Rule '{rule}': '{key}' needs at least one condition")
+        scalars = tuple(scalar for scalar, _ in parts)
+        vectors = tuple(vector for _, vector in parts)
+        if key == 'all':
+            def all_of(record):
+                for part in scalars:
+                    if not part(record):
+                        return False
+                return True
+            return all_of, lambda columns: np.logical_and.reduce([v(columns) for v in vectors])
+
+        def any_of(record):
+            for part in scalars:
+                if part(record):
+                    return True
+            return False
+        return any_of, lambda columns: np.logical_or.reduce([v(columns) for v in vectors])
+    if 'not' in cond:
+        scalar, vector = _compile(cond['not'], rule)
+        return (lambda record: not scalar(record)), (lambda columns: ~vector(columns))
+
+    field, op, value = cond.get('field'), cond.get('op'), cond.get('value')
+    if field not in RULE_FIELDS:
+        raise ValueError(f"Rule '{rule}': unknown field '{field}' (one of {', '.join(RULE_FIELDS)})")
+    i = RULE_FIELDS.index(field)
+    numeric = field in NUMERIC_FIELDS
+    if not numeric and op not in ('==', '!=', 'in', 'not_in'):
+        raise ValueError(f"Rule '{rule}': '{op}' only applies to numeric fields")
+
+    def check(v):
+        ok = isinstance(v, (int, float)) and not isinstance(v, bool) if numeric else isinstance(v, (str, int))
+        if not ok:
+            raise ValueError(f"Rule '{rule}': bad value {v!r} for field '{field}'")
+        return float(v) if numeric else str(v)
+
+    if op in ('in', 'not_in'):
+        if not isinstance(value, list):
+            raise ValueError(f"Rule '{rule}': '{op}' needs a list")
+        members = frozenset(check(v) for v in value)
+        if numeric:
+            listed = np.array(sorted(members))
+            vector = lambda columns: np.isin(columns[i], listed)
+        else:
+            vector = lambda columns: np.fromiter(
+                (x in members for x in columns[i]), dtype=bool, count=len(columns[i])
+            )
+        if op == 'in':
+            return (lambda record: record[i] in members), vector
+        return (lambda record: record[i] not in members), (lambda columns: ~vector(columns))
+    if op == 'between':
+        if not isinstance(value, list) or len(value) != 2:
+            raise ValueError(f"Rule '{rule}': 'between' needs [low, high]")
+        low, high = (check(v) for v in value)
+        return (
+            lambda record: low <= record[i] <= high,
+            lambda columns: (columns[i] >= low) & (columns[i] <= high),
+        )
+    if op in COMPARISONS:
+        compare, value = COMPARISONS[op], check(value)
+        if numeric:
+            return (lambda record: compare(record[i], value)), (lambda columns: compare(columns[i], value))
+        # Missing ids (None) never equal anything, and are never "!=" either
+        return (
+            lambda record: record[i] is not None and compare(record[i], value),
+            lambda columns: np.fromiter(
+                (x is not None and compare(x, value) for x in columns[i]), dtype=bool, count=len(columns[i])
+            ),
+        )
+    raise ValueError(f"Rule '{rule}': unknown op '{op}'")
+
+
+class _Columns:
+    # Lazily built columns for vectorized rules: numeric fields are float
+    # arrays sliced from the feature matrix, entity ids are only gathered
+    # into lists if some rule asks for them
+    def __init__(self, rows, entities):
+        self.rows = rows
+        self.entities = entities
+        self._cache = {}
+
+    def __getitem__(self, i):
+        column = self._cache.get(i)
+        if column is None:
+            if i < len(FEATURES):
+                column = self.rows[:, i]
+            elif self.entities is None:
+                column = [None] * len(self.rows)
+            else:
+                j = i - len(FEATURES)
+                column = [ids[j] if ids is not None else None for ids in self.entities]
+            self._cache[i] = column
+        return column
+
+
+class RuleSet:
+    """An ordered, compiled rule cascade run before the model.
+
+    The first matching rule decides: "block" or "allow" is returned as the
+    decision and the model is never called for that row. Rules see the
+    request fields (amount, ip_risk, time and the entity ids). Hits are
+    counted per rule in the metrics registry, next to how many rows were
+    evaluated, so /stats and /metrics show how much model work is saved.
+    """
+
+    def __init__(self, rules, source=None):
+        if not isinstance(rules, list):
+            raise ValueError("Rules must be a JSON list")
+        self.source = source
+        self.rules = []
+        names = set()
+        for rule in rules:
+            name = rule.get('name') if isinstance(rule, dict) else None
+            if not isinstance(name, str) or not name or name in names:
+                raise ValueError(f"Every rule needs a unique name (got {name!r})")
+            names.add(name)
+            action = rule.get('action')
+            if action not in ACTIONS:
+                raise ValueError(f"Rule '{name}': action must be one of {', '.join(ACTIONS)}")
+            blocked = action == 'block'
+            decision = {
+                "fraud_probability": None,
+                "is_blocked": blocked,
+                "risk_level": "CRITICAL" if blocked else "NORMAL",
+                "rule": name,
+                "model_version": None,
+            }
+            scalar, vector = _compile(rule.get('when'), name)
+            self.rules.append((name, action, scalar, vector, decision))
+
+    def _decide_columns(self, rows, entities):
+        # Each rule is a handful of NumPy ops over the whole batch; a row is
+        # claimed by the first rule that matches it
+        columns = _Columns(rows, entities)
+        undecided = np.ones(len(rows), dtype=bool)
+        results, hits = [None] * len(rows), {}
+        for name, action, _, matches, decision in self.rules:
+            claimed = np.flatnonzero(matches(columns) & undecided)
+            if len(claimed):
+                undecided[claimed] = False
+                hits[name, action] = len(claimed)
+                for i in claimed.tolist():
+                    results[i] = dict(decision)
+            if not undecided.any():
+                break
+        return results, hits
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path) as f:
+            return cls(json.load(f), source=path)
+
+    def decide(self, rows, entities=None):
+        """One decision dict (a rule fired) or None (ask the model) per row.
+
+        rows: float matrix whose first columns are amount, ip_risk, time;
+        entities: None or one (card, account, ip, merchant) tuple (or None)
+        per row.
+        """
+        if len(rows) >= VECTOR_MIN_ROWS:
+            results, hits = self._decide_columns(rows, entities)
+        else:
+            no_ids = (None,) * len(ENTITY_FIELDS)
+            results, hits = [], {}
+            for n, row in enumerate(rows[:, :len(FEATURES)].tolist()):
+                ids = entities[n] if entities is not None else None
+                record = tuple(row) + (ids or no_ids)
+                for name, action, matches, _, decision in self.rules:
+                    if matches(record):
+                        results.append(dict(decision))
+                        hits[name, action] = hits.get((name, action), 0) + 1
+                        break
+                else:
+                    results.append(None)
+
+        metrics.inc('rules_evaluated_total', len(results))
+        for (name, action), count in hits.items():
+            metrics.inc('rule_hits_total', count, rule=name, action=action)
+            metrics.inc('decisions_total', count, decision='blocked' if action == 'block' else 'normal')
+        return results
+
+    def stats(self):
+        _, counters = metrics.collect()
+        hits = {
+            dict(labels)['rule']: value
+            for (name, labels), value in counters.items() if name == 'rule_hits_total'
+        }
+        evaluated = counters.get(('rules_evaluated_total', ()), 0)
+        decided = sum(hits.get(rule[0], 0) for rule in self.rules)
+        return {
+            "enabled": True,
+            "source": self.source,
+            "rules": [
+                {"name": name, "action": action, "hits": hits.get(name, 0)}
+                for name, action, _, _, _ in self.rules
+            ],
+            "evaluated": evaluated,
+            "short_circuited": decided,
+            "model_calls_saved": round(decided / evaluated, 4) if evaluated else 0.0,
+        }
@@ -0,0 +1,164 @@
+import os
+import threading
+from collections import deque
+from time import perf_counter
+
+import numpy as np
+
+from app.services.metrics import metrics
+
+# Score histograms use this many equal-width bins over [0, 1]
+HISTOGRAM_BINS = 20
+
+
+def _histogram(probs):
+    bins = np.minimum((probs * HISTOGRAM_BINS).astype(np.intp), HISTOGRAM_BINS - 1)
+    return np.bincount(bins, minlength=HISTOGRAM_BINS)
+
+
+class _CandidateStats:
+    # Running comparison of one candidate against the primary model. Only
+    # the worker thread writes it.
+    def __init__(self, version):
+        self.version = version
+        self.rows = 0
+        self.agree = 0
+        self.candidate_blocks = 0     # candidate blocks, primary allowed
+        self.candidate_allows = 0     # candidate allows, primary blocked
+        self.abs_diff_sum = 0.0
+        self.histogram = np.zeros(HISTOGRAM_BINS, dtype=np.int64)
+
+    def update(self, primary, candidate, threshold):
+        primary_blocks, candidate_blocks = primary > threshold, candidate > threshold
+        n = len(primary)
+        blocks = int(np.count_nonzero(candidate_blocks & ~primary_blocks))
+        allows = int(np.count_nonzero(primary_blocks & ~candidate_blocks))
+        self.rows += n
+        self.agree += n - blocks - allows
+        self.candidate_blocks += blocks
+        self.candidate_allows += allows
+        self.abs_diff_sum += float(np.abs(candidate - primary).sum())
+        self.histogram += _histogram(candidate)
+        metrics.inc('shadow_rows_total', n, candidate=self.version)
+        metrics.inc('shadow_disagreements_total', blocks + allows, candidate=self.version)
+
+    def stats(self):
+        return {
+            "version": self.version,
+            "rows": self.rows,
+            "agreement": round(self.agree / self.rows, 4) if self.rows else None,
+            "disagreements": {
+                "candidate_blocks": self.candidate_blocks,
+                "candidate_allows": self.candidate_allows,
+            },
+            "mean_abs_diff": round(self.abs_diff_sum / self.rows, 4) if self.rows else None,
+            "score_histogram": self.histogram.tolist(),
+        }
+
+
+class ShadowScorer:
+    """Scores live traffic with candidate models off the request path.
+
+    offer() is called with each feature matrix the primary model scored and
+    the probabilities it returned. It only appends to a deque (O(1)) and
+    never blocks: once max_queue_rows rows are waiting, new samples are
+    dropped and counted. A single background worker drains the queue in
+    batches of up to batch_rows, scores them with every candidate and keeps
+    agreement statistics and score histograms per candidate.
+    """
+
+    def __init__(self, threshold, max_queue_rows=10000, batch_rows=512):
+        self.threshold = threshold
+        self.max_queue_rows = max_queue_rows
+        self.batch_rows = batch_rows
+        self.candidates = ()            # LoadedModel objects, replaced as a whole
+        self._stats = {}                # version -> _CandidateStats
+
+        self._queue = deque()
+        self._queued_rows = 0
+        self._cond = threading.Condition()
+        self._thread = None
+        self._pid = None
+
+        self.dropped = 0
+        self.batches = 0
+        self.errors = 0
+        self.last_error = None
+        self.score_seconds = 0.0
+        self.primary_histogram = np.zeros(HISTOGRAM_BINS, dtype=np.int64)
+
+    def set_candidates(self, candidates):
+        with self._cond:
+            self.candidates = tuple(candidates)
+            self._stats = {c.version: _CandidateStats(c.version) for c in self.candidates}
+            self.primary_histogram[:] = 0
+            self._queue.clear()
+            self._queued_rows = 0
+
+    def offer(self, features, probs):
+        if not self.candidates:
+            return
+        n = len(features)
+        with self._cond:
+            if self._queued_rows + n > self.max_queue_rows:
+                self.dropped += n
+                metrics.inc('shadow_dropped_total', n)
+                return
+            self._queue.append((features, probs))
+            self._queued_rows += n
+            self._cond.notify()
+        self._ensure_started()
+
+    def _ensure_started(self):
+        # Threads do not survive fork(), so restart the worker in each child
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._cond:
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name="shadow-scorer", daemon=True)
+                self._thread.start()
+
+    def _take(self):
+        with self._cond:
+            while not self._queue:
+                self._cond.wait()
+            batch, rows = [], 0
+            while self._queue and rows < self.batch_rows:
+                features, probs = self._queue.popleft()
+                batch.append((features, probs))
+                rows += len(features)
+            self._queued_rows -= rows
+            return batch, self.candidates, self._stats
+
+    def _run(self):
+        while True:
+            batch, candidates, stats = self._take()
+            features = np.concatenate([f for f, _ in batch])
+            primary = np.concatenate([p for _, p in batch])
+            start = perf_counter()
+            try:
+                for candidate in candidates:
+                    probs = candidate.predict_proba(features[:, :candidate.n_features])
+                    stats[candidate.version].update(primary, probs, self.threshold)
+            except Exception as e:
+                self.errors += 1
+                self.last_error = f"{type(e).__name__}: {e}"
+                continue
+            self.score_seconds += perf_counter() - start
+            self.primary_histogram += _histogram(primary)
+            self.batches += 1
+
+    def stats(self):
+        return {
+            "enabled": True,
+            "candidates": [s.stats() for s in self._stats.values()],
+            "primary_histogram": self.primary_histogram.tolist(),
+            "queued_rows": self._queued_rows,
+            "max_queue_rows": self.max_queue_rows,
+            "dropped_rows": self.dropped,
+            "batches": self.batches,
+            "mean_batch_ms": round(self.score_seconds / self.batches * 1000, 3) if self.batches else 0.0,
+            "errors": self.errors,
+            "last_error": self.last_error,
+        }
@@ -0,0 +1,150 @@
+import json
+
+import numpy as np
+
+
+class TreeEnsemble:
+    """Pure-NumPy scorer for a binary:logistic XGBoost gbtree model.
+
+    The booster's trees are exported once into flat arrays (one slot per
+    node across all trees), renumbered so that every right child sits
+    right after its left sibling. Scoring walks every tree for every row at
+    the same time: each step gathers the current node's feature and
+    threshold for the whole (rows x trees) index matrix and moves to
+    left + went_right. Leaves test a sentinel column that is always -inf
+    against a +inf threshold, so they loop back onto themselves and
+    max_depth steps settle every path without a DMatrix or per-row Python.
+    """
+
+    def __init__(self, feature, threshold, left, default_left, value,
+                 roots, max_depth, base_margin, num_feature):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.default_left = default_left
+        self.value = value
+        self.roots = roots
+        self.max_depth = max_depth
+        self.base_margin = base_margin
+        self.num_feature = num_feature
+
+    @classmethod
+    def from_booster(cls, booster):
+        model = json.loads(booster.save_raw(raw_format='json'))
+        learner = model['learner']
+
+        objective = learner['objective']['name']
+        if objective != 'binary:logistic':
+            raise ValueError(f"Unsupported objective '{objective}'")
+        gbm = learner['gradient_booster']
+        if gbm['name'] != 'gbtree':
+            raise ValueError(f"Unsupported booster '{gbm['name']}'")
+
+        params = learner['learner_model_param']
+        if int(params.get('num_class', 0)) > 1 or int(params.get('num_target', 1)) > 1:
+            raise ValueError("Only single-output models are supported")
+        # Newer releases store base_score as a vector string like "[5E-1]"
+        base_score = float(params['base_score'].strip('[]'))
+        num_feature = int(params['num_feature'])
+
+        trees = gbm['model']['trees']
+        best = booster.attr('best_iteration')
+        if best is not None:
+            per_round = int(gbm['model']['gbtree_model_param'].get('num_parallel_tree', 1))
+            trees = trees[:(int(best) + 1) * per_round]
+
+        feature, threshold, left, default_left, value, roots = [], [], [], [], [], []
+        max_depth, offset = 0, 0
+        for tree in trees:
+            if any(tree.get('split_type', [])):
+                raise ValueError("Categorical splits are not supported")
+            nodes = _flatten_tree(tree, num_feature, offset)
+            for column, part in zip((feature, threshold, left, default_left, value), nodes[:5]):
+                column.append(part)
+            roots.append(offset)
+            max_depth = max(max_depth, nodes[5])
+            offset += len(nodes[0])
+
+        return cls(
+            feature=np.concatenate(feature or [np.zeros(0, np.intp)]),
+            threshold=np.concatenate(threshold or [np.zeros(0, np.float32)]),
+            left=np.concatenate(left or [np.zeros(0, np.intp)]),
+            default_left=np.concatenate(default_left or [np.zeros(0, bool)]),
+            value=np.concatenate(value or [np.zeros(0, np.float32)]),
+            roots=np.asarray(roots, dtype=np.intp),
+            max_depth=max_depth,
+            base_margin=_logit(base_score),
+            num_feature=num_feature,
+        )
+
+    def predict_margin(self, X):
+        # XGBoost compares in float32, so do the same to land on identical leaves
+        X = np.asarray(X, dtype=np.float32).reshape(-1, self.num_feature)
+        n_rows, width = X.shape[0], self.num_feature + 1
+        if n_rows == 0 or len(self.roots) == 0:
+            return np.full(n_rows, self.base_margin, dtype=np.float64)
+
+        # Extra -inf column is what leaves "split" on
+        padded = np.empty((n_rows, width), dtype=np.float32)
+        padded[:, :-1] = X
+        padded[:, -1] = -np.inf
+        flat = padded.ravel()
+        has_nan = bool(np.isnan(X).any())
+
+        row_base = np.arange(0, n_rows * width, width, dtype=np.intp)[:, None]
+        idx = np.tile(self.roots, (n_rows, 1))
+        for _ in range(self.max_depth):
+            x = flat[row_base + self.feature[idx]]
+            go_right = x >= self.threshold[idx]
+            if has_nan:
+                missing = np.isnan(x)
+                go_right[missing] = ~self.default_left[idx[missing]]
+            idx = self.left[idx] + go_right
+
+        return self.value[idx].sum(axis=1, dtype=np.float64) + self.base_margin
+
+    def predict_proba(self, X):
+        # Positive-class probability, same as XGBClassifier.predict_proba(X)[:, 1]
+        return 1.0 / (1.0 + np.exp(-self.predict_margin(X)))
+
+
+def _flatten_tree(tree, num_feature, offset):
+    # Breadth-first renumbering so right child == left child + 1
+    lc, rc = tree['left_children'], tree['right_children']
+    conditions = np.asarray(tree['split_conditions'], dtype=np.float32)
+
+    order, new_id, depth = [0], {0: 0}, 0
+    level = [0]
+    while level:
+        nxt = []
+        for node in level:
+            if lc[node] != -1:
+                for child in (lc[node], rc[node]):
+                    new_id[child] = len(order)
+                    order.append(child)
+                    nxt.append(child)
+        if nxt:
+            depth += 1
+        level = nxt
+
+    n = len(order)
+    feature = np.full(n, num_feature, dtype=np.intp)          # leaves -> sentinel
+    threshold = np.full(n, np.inf, dtype=np.float32)
+    left = np.arange(offset, offset + n, dtype=np.intp)        # leaves -> self
+    default_left = np.ones(n, dtype=bool)
+    value = np.zeros(n, dtype=np.float32)
+    for new, old in enumerate(order):
+        if lc[old] == -1:
+            # For leaf nodes split_conditions holds the leaf weight
+            value[new] = conditions[old]
+        else:
+            feature[new] = tree['split_indices'][old]
+            threshold[new] = conditions[old]
+            left[new] = offset + new_id[lc[old]]
+            default_left[new] = bool(tree['default_left'][old])
+    return feature, threshold, left, default_left, value, depth
+
+
+def _logit(p):
+    p = min(max(p, 1e-16), 1 - 1e-16)
+    return float(np.log(p / (1 - p)))
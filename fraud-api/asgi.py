@@ -0,0 +1,8 @@
+from app.asgi import create_asgi_app
+
+# Async entry point: uvicorn asgi:app --host 0.0.0.0 --port 5000
+app = create_asgi_app()
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host='0.0.0.0', port=5000)
@@ -0,0 +1,168 @@
+"""fraud_client throughput vs naive per-call posting.
+
+Starts `gunicorn -c gunicorn.conf.py wsgi:app` locally (admission control
+off, so nothing is shed), then for a fixed time has --callers threads
+score one transaction per call in three ways:
+
+- naive:  a new connection and one POST /api/v1/predict per call, like an
+          ad-hoc `requests.post`
+- client: FraudClient.predict (pooled keep-alive connections, calls
+          batched into /api/v1/predict/batch)
+- async:  --callers concurrent tasks awaiting AsyncFraudClient.predict
+
+    python benchmarks/bench_client.py --duration 10 --callers 32 --workers 2
+"""
+import argparse
+import asyncio
+import http.client
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+from benchmarks.bench_prefork import wait_ready  # noqa: E402
+from fraud_client import AsyncFraudClient, FraudClient  # noqa: E402
+
+MODES = ('naive', 'client', 'async')
+
+
+def transaction(rng):
+    return {"amount": round(rng.uniform(1, 5000), 2), "ip_risk": round(rng.random(), 3), "time": rng.randrange(24)}
+
+
+def naive_call(port, item):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    try:
+        conn.request('POST', '/api/v1/predict', json.dumps(item), {'Content-Type': 'application/json'})
+        response = conn.getresponse()
+        response.read()
+        if response.status != 200:
+            raise RuntimeError(f"HTTP {response.status}")
+    finally:
+        conn.close()
+
+
+def drive_threads(call, duration, callers):
+    latencies, errors = [[] for _ in range(callers)], [0] * callers
+    stop = time.perf_counter() + duration
+
+    def caller(i):
+        rng = random.Random(i)
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            try:
+                call(transaction(rng))
+            except Exception:
+                errors[i] += 1
+                continue
+            latencies[i].append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=caller, args=(i,)) for i in range(callers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return [x for per in latencies for x in per], sum(errors)
+
+
+async def drive_async(client, duration, callers):
+    latencies, errors = [], 0
+    stop = time.perf_counter() + duration
+
+    async def caller(i):
+        nonlocal errors
+        rng = random.Random(i)
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            try:
+                await client.predict(**transaction(rng))
+            except Exception:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(caller(i) for i in range(callers)))
+    return latencies, errors
+
+
+def run_mode(mode, port, duration, callers, max_batch, max_wait_ms):
+    url = f'http://127.0.0.1:{port}'
+    stats = {}
+    if mode == 'naive':
+        latencies, errors = drive_threads(lambda item: naive_call(port, item), duration, callers)
+    elif mode == 'client':
+        with FraudClient(url, max_batch=max_batch, max_wait_ms=max_wait_ms) as client:
+            latencies, errors = drive_threads(lambda item: client.predict(**item), duration, callers)
+            stats = client.stats()
+    else:
+        async def main():
+            async with AsyncFraudClient(url, max_batch=max_batch, max_wait_ms=max_wait_ms) as client:
+                result = await drive_async(client, duration, callers)
+                return result, client.stats()
+        (latencies, errors), stats = asyncio.run(main())
+
+    ms = np.array(latencies) * 1000 if latencies else np.zeros(1)
+    return {
+        "mode": mode,
+        "calls_per_sec": round(len(latencies) / duration, 1),
+        "errors": errors,
+        "p50_ms": round(float(np.percentile(ms, 50)), 2),
+        "p99_ms": round(float(np.percentile(ms, 99)), 2),
+        "http_requests": stats.get("requests", len(latencies) + errors),
+        "connections_opened": stats.get("connections_opened", len(latencies) + errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--modes', default=','.join(MODES))
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--callers', type=int, default=32)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--max-batch', type=int, default=64)
+    parser.add_argument('--max-wait-ms', type=float, default=2.0)
+    parser.add_argument('--port', type=int, default=5098)
+    parser.add_argument('--json', help="also write results to this file")
+    args = parser.parse_args()
+
+    env = dict(os.environ, WEB_CONCURRENCY=str(args.workers), SECRET_KEY='bench', ADMISSION_ENABLED='0')
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+         '-b', f'127.0.0.1:{args.port}', 'wsgi:app'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    results = []
+    try:
+        wait_ready(args.port)
+        print(f"{'mode':>7} {'calls/s':>9} {'err':>5} {'p50 ms':>8} {'p99 ms':>8} {'HTTP reqs':>10} {'conns':>7}")
+        for mode in args.modes.split(','):
+            r = run_mode(mode, args.port, args.duration, args.callers, args.max_batch, args.max_wait_ms)
+            results.append(r)
+            print(f"{r['mode']:>7} {r['calls_per_sec']:>9} {r['errors']:>5} {r['p50_ms']:>8} "
+                  f"{r['p99_ms']:>8} {r['http_requests']:>10} {r['connections_opened']:>7}")
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=30)
+
+    naive = next((r for r in results if r['mode'] == 'naive'), None)
+    if naive and naive['calls_per_sec']:
+        for r in results:
+            if r is not naive:
+                print(f"📈 {r['mode']}: {r['calls_per_sec'] / naive['calls_per_sec']:.1f}x naive throughput")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({"cpu_count": os.cpu_count(), "callers": args.callers, "workers": args.workers,
+                       "results": results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
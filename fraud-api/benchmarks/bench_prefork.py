@@ -0,0 +1,151 @@
+"""Memory and throughput of the pre-fork server as the worker count grows.
+
+For each worker count this starts `gunicorn -c gunicorn.conf.py wsgi:app`,
+drives /api/v1/predict with keep-alive clients for a fixed time, and reads
+every worker's RSS and PSS from /proc (PSS splits shared pages between the
+processes sharing them, so it shows what copy-on-write sharing saves).
+
+    python benchmarks/bench_prefork.py --workers 1,2,4 --duration 10 --clients 16
+"""
+import argparse
+import http.client
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+BODY = json.dumps({"amount": 250.0, "ip_risk": 0.3, "time": 14})
+
+
+def wait_ready(port, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/readyz')
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("server did not become ready")
+
+
+def children(pid):
+    kids = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # the comm field may contain spaces; ppid comes after ')'
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == pid:
+            kids.append(int(entry))
+    return kids
+
+
+def memory_mb(pid):
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            key, _, rest = line.partition(':')
+            if key in ('Rss', 'Pss'):
+                values[key.lower()] = int(rest.split()[0]) / 1024
+    return values
+
+
+def drive(port, duration, clients):
+    counts, errors = [0] * clients, [0] * clients
+    stop = time.time() + duration
+
+    def client(i):
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+        headers = {'Content-Type': 'application/json'}
+        while time.time() < stop:
+            try:
+                conn.request('POST', '/api/v1/predict', BODY, headers)
+                response = conn.getresponse()
+                response.read()
+                if response.status == 200:
+                    counts[i] += 1
+                else:
+                    errors[i] += 1
+            except (OSError, http.client.HTTPException):
+                errors[i] += 1
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return sum(counts) / duration, sum(errors)
+
+
+def run(workers, port, duration, clients):
+    # Admission control off: all clients share 127.0.0.1 and would be rate limited
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), SECRET_KEY='bench', ADMISSION_ENABLED='0')
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+         '-b', f'127.0.0.1:{port}', 'wsgi:app'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_ready(port)
+        master = memory_mb(proc.pid)
+        idle = [memory_mb(pid) for pid in children(proc.pid)]
+        rps, errors = drive(port, duration, clients)
+        busy = [memory_mb(pid) for pid in children(proc.pid)]
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=30)
+
+    def avg(samples, key):
+        return round(sum(s[key] for s in samples) / len(samples), 1) if samples else 0.0
+
+    return {
+        "workers": workers,
+        "requests_per_sec": round(rps, 1),
+        "errors": errors,
+        "master_rss_mb": round(master['rss'], 1),
+        "worker_rss_mb_idle": avg(idle, 'rss'),
+        "worker_pss_mb_idle": avg(idle, 'pss'),
+        "worker_rss_mb_loaded": avg(busy, 'rss'),
+        "worker_pss_mb_loaded": avg(busy, 'pss'),
+        "total_pss_mb_loaded": round(master['pss'] + sum(s['pss'] for s in busy), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', default='1,2,4')
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--port', type=int, default=5099)
+    parser.add_argument('--json', help="also write results to this file")
+    args = parser.parse_args()
+
+    results = []
+    header = f"{'workers':>7} {'req/s':>9} {'err':>5} {'worker RSS':>11} {'worker PSS':>11} {'total PSS':>10}"
+    print(header)
+    for n in (int(w) for w in args.workers.split(',')):
+        r = run(n, args.port, args.duration, args.clients)
+        results.append(r)
+        print(f"{r['workers']:>7} {r['requests_per_sec']:>9} {r['errors']:>5} "
+              f"{r['worker_rss_mb_loaded']:>8} MB {r['worker_pss_mb_loaded']:>8} MB "
+              f"{r['total_pss_mb_loaded']:>7} MB")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({"cpu_count": os.cpu_count(), "results": results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""Native tree evaluator vs XGBClassifier.predict_proba.
+
+Checks that both paths agree on random inputs (including missing values;
+tests/test_tree_eval.py asserts the same under pytest),
+then times them at batch sizes 1, 64 and 4096 (or --sizes).
+
+    python benchmarks/bench_tree_eval.py [--trees 100] [--depth 6] [--sizes 1,64,4096]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import xgboost as xgb
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from app.services.tree_eval import TreeEnsemble  # noqa: E402
+
+SCALE = np.array([5000.0, 1.0, 24.0])
+
+
+def make_model(n_trees, depth, rng):
+    X = rng.random((20000, 3)) * SCALE
+    y = ((X[:, 0] / 5000 + X[:, 1] > 1.1) ^ (rng.random(len(X)) < 0.05)).astype(int)
+    X[rng.random(X.shape) < 0.02] = np.nan
+    return xgb.XGBClassifier(n_estimators=n_trees, max_depth=depth, eval_metric='logloss').fit(X, y)
+
+
+def check_parity(model, evaluator, rng, n_rows=10000, tol=1e-5):
+    X = rng.random((n_rows, 3)) * SCALE * 1.2
+    X[rng.random(X.shape) < 0.05] = np.nan
+    expected = model.predict_proba(X)[:, 1]
+    got = evaluator.predict_proba(X)
+    worst = float(np.max(np.abs(expected - got)))
+    print(f"parity: max |diff| = {worst:.2e} over {n_rows} rows")
+    if worst > tol:
+        sys.exit(f"❌ native evaluator disagrees with predict_proba (tol {tol})")
+
+
+def time_call(fn, X, min_seconds=0.5):
+    fn(X)  # warm-up
+    calls, start = 0, time.perf_counter()
+    while True:
+        fn(X)
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return elapsed / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--trees', type=int, default=100)
+    parser.add_argument('--depth', type=int, default=6)
+    parser.add_argument('--sizes', default='1,64,4096')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    model = make_model(args.trees, args.depth, rng)
+    evaluator = TreeEnsemble.from_booster(model.get_booster())
+    check_parity(model, evaluator, rng)
+
+    print(f"\n{'batch':>6} {'predict_proba':>16} {'native':>12} {'speedup':>8}")
+    for size in [int(s) for s in args.sizes.split(',')]:
+        X = rng.random((size, 3)) * SCALE
+        wrapper = time_call(lambda a: model.predict_proba(a)[:, 1], X)
+        native = time_call(evaluator.predict_proba, X)
+        print(f"{size:>6} {wrapper * 1e6:>13.1f} us {native * 1e6:>9.1f} us {wrapper / native:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,348 @@
+"""Load test / latency benchmark for the fraud API.
+
+Replays recorded transaction payloads (a JSONL file, one transaction object
+per line; lines that are not transactions are skipped) or synthetic ones
+against /predict, /predict/batch and /predict/stream at a range of
+concurrency levels, optionally paced to a target request rate. Prints a
+summary table and writes machine-readable JSON.
+
+    # in-process through the Flask test client
+    python benchmarks/loadtest.py --concurrency 1,8,32 --duration 10 --out run.json
+
+    # against a running server, or one started for the run
+    python benchmarks/loadtest.py --url http://127.0.0.1:5000 --rate 500
+    python benchmarks/loadtest.py --spawn --payloads recorded.jsonl
+
+    # regression mode: compare against a stored run, exit 1 on regressions
+    python benchmarks/loadtest.py --baseline baseline.json --tolerance 0.15
+
+Latency is measured from when a request was *scheduled* to be sent, so a
+server that falls behind a --rate target shows up in the tail instead of
+silently lowering the offered load (no coordinated omission).
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlparse
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+ENDPOINTS = ('single', 'batch', 'stream')
+FIELDS = ('amount', 'ip_risk', 'time')
+
+
+# --- payloads ---
+def load_payloads(path):
+    payloads = []
+    with open(path) as f:
+        for line in f:
+            try:
+                item = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(item, dict) and all(k in item for k in FIELDS):
+                payloads.append(item)
+    if not payloads:
+        sys.exit(f"❌ No transaction payloads found in {path}")
+    return payloads
+
+
+def synthetic_payloads(n, seed=0):
+    rng = random.Random(seed)
+    return [
+        {
+            "amount": round(rng.lognormvariate(4.5, 1.2), 2),
+            "ip_risk": round(rng.random(), 3),
+            "time": rng.randint(0, 23),
+        }
+        for _ in range(n)
+    ]
+
+
+def build_request(endpoint, payloads, cursor, batch_size):
+    # Returns (path, body bytes, content type, rows in request)
+    if endpoint == 'single':
+        return '/api/v1/predict', json.dumps(payloads[cursor % len(payloads)]).encode(), 'application/json', 1
+    items = [payloads[(cursor + i) % len(payloads)] for i in range(batch_size)]
+    if endpoint == 'batch':
+        return '/api/v1/predict/batch', json.dumps({"transactions": items}).encode(), 'application/json', batch_size
+    body = ''.join(json.dumps(item) + '\n' for item in items).encode()
+    return '/api/v1/predict/stream', body, 'application/x-ndjson', batch_size
+
+
+# --- clients ---
+class InProcessClient:
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def post(self, path, body, content_type):
+        response = self.client.post(path, data=body, content_type=content_type)
+        response.get_data()
+        return response.status_code
+
+    def get(self, path):
+        return self.client.get(path).get_data(as_text=True)
+
+
+class HttpClient:
+    def __init__(self, url):
+        parsed = urlparse(url)
+        self.host, self.port = parsed.hostname, parsed.port or 80
+        self.conn = None
+
+    def _request(self, method, path, body=None, headers=None):
+        for attempt in (0, 1):
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            try:
+                self.conn.request(method, path, body, headers or {})
+                response = self.conn.getresponse()
+                return response.status, response.read()
+            except (OSError, http.client.HTTPException):
+                self.conn.close()
+                self.conn = None
+                if attempt:
+                    raise
+
+    def post(self, path, body, content_type):
+        return self._request('POST', path, body, {'Content-Type': content_type})[0]
+
+    def get(self, path):
+        return self._request('GET', path)[1].decode()
+
+
+# --- per-stage costs from /metrics ---
+def scrape_stages(client):
+    # {stage: [seconds, count]} from the fraud_stage_latency_seconds histogram
+    stages = {}
+    for line in client.get('/metrics').splitlines():
+        if line.startswith('fraud_stage_latency_seconds_sum') or line.startswith('fraud_stage_latency_seconds_count'):
+            name, value = line.rsplit(' ', 1)
+            stage = name.split('stage="', 1)[1].split('"', 1)[0]
+            slot = 0 if '_sum{' in name else 1
+            stages.setdefault(stage, [0.0, 0])[slot] = float(value)
+    return stages
+
+
+def stage_costs(before, after):
+    # Mean microseconds per observation for each stage during the scenario
+    costs = {}
+    for stage, (seconds, count) in after.items():
+        prev_seconds, prev_count = before.get(stage, (0.0, 0))
+        if count > prev_count:
+            costs[stage] = round((seconds - prev_seconds) / (count - prev_count) * 1e6, 1)
+    return costs
+
+
+# --- running a scenario ---
+def run_scenario(make_client, endpoint, concurrency, payloads, args):
+    per_worker_rate = args.rate / concurrency if args.rate else None
+    latencies = [[] for _ in range(concurrency)]
+    errors = [0] * concurrency
+    rows = [0] * concurrency
+    start = time.perf_counter() + 0.05
+    stop = start + args.duration
+
+    def worker(w):
+        client = make_client()
+        cursor = w * 7919
+        sent = 0
+        while True:
+            scheduled = start + sent / per_worker_rate if per_worker_rate else time.perf_counter()
+            if scheduled >= stop:
+                return
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            path, body, content_type, n_rows = build_request(endpoint, payloads, cursor, args.batch_size)
+            try:
+                status = client.post(path, body, content_type)
+            except Exception:
+                status = 0
+            latencies[w].append(time.perf_counter() - scheduled)
+            if 200 <= status < 300:
+                rows[w] += n_rows
+            else:
+                errors[w] += 1
+            cursor += n_rows
+            sent += 1
+
+    probe = make_client()
+    before = scrape_stages(probe)
+    threads = [threading.Thread(target=worker, args=(w,)) for w in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = max(time.perf_counter() - start, 1e-9)
+    stages = stage_costs(before, scrape_stages(probe))
+
+    all_latencies = np.array([x for per in latencies for x in per]) * 1000
+    total = len(all_latencies)
+    p50, p95, p99 = np.percentile(all_latencies, [50, 95, 99]) if total else (0.0, 0.0, 0.0)
+    return {
+        "endpoint": endpoint,
+        "concurrency": concurrency,
+        "target_rate": args.rate,
+        "batch_size": 1 if endpoint == 'single' else args.batch_size,
+        "requests": total,
+        "errors": sum(errors),
+        "error_rate": round(sum(errors) / total, 4) if total else 0.0,
+        "throughput_rps": round(total / elapsed, 1),
+        "rows_per_sec": round(sum(rows) / elapsed, 1),
+        "latency_ms": {
+            "p50": round(float(p50), 3),
+            "p95": round(float(p95), 3),
+            "p99": round(float(p99), 3),
+            "max": round(float(all_latencies.max()), 3) if total else 0.0,
+        },
+        # server-side mean cost per stage (parse/validate/model/serialize...);
+        # /metrics is per process, so with several workers this is one sample
+        "stage_us": stages,
+    }
+
+
+# --- regression mode ---
+def compare(results, baseline, tolerance):
+    def key(r):
+        return r["endpoint"], r["concurrency"], r["batch_size"], r["target_rate"]
+
+    previous = {key(r): r for r in baseline["scenarios"]}
+    regressions = []
+    for r in results:
+        old = previous.get(key(r))
+        if old is None:
+            continue
+        label = f"{r['endpoint']} c={r['concurrency']}"
+        if r["throughput_rps"] < old["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{label}: throughput {old['throughput_rps']} -> {r['throughput_rps']} req/s")
+        if r["latency_ms"]["p99"] > old["latency_ms"]["p99"] * (1 + tolerance):
+            regressions.append(f"{label}: p99 {old['latency_ms']['p99']} -> {r['latency_ms']['p99']} ms")
+        if r["error_rate"] > old["error_rate"] + 0.01:
+            regressions.append(f"{label}: error rate {old['error_rate']} -> {r['error_rate']}")
+    return regressions
+
+
+# --- targets ---
+def in_process_target(json_provider):
+    import logging
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    from app import create_app
+    from config import Config
+
+    class BenchConfig(Config):
+        DEBUG = False
+        MODEL_BACKGROUND_LOAD = False
+        JSON_PROVIDER = json_provider
+
+    app = create_app(BenchConfig)
+    return lambda: InProcessClient(app)
+
+
+def spawn_server(port, workers):
+    # Admission control off: every client here is 127.0.0.1, so its per-client
+    # rate limit would turn the measurement into a 429 count
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), SECRET_KEY='loadtest', ADMISSION_ENABLED='0')
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '-b', f'127.0.0.1:{port}', 'wsgi:app'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    probe = HttpClient(f'http://127.0.0.1:{port}')
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            if probe._request('GET', '/readyz')[0] == 200:
+                return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.terminate()
+    sys.exit("❌ Spawned server never became ready")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help="benchmark a running server instead of the in-process app")
+    parser.add_argument('--spawn', action='store_true', help="start gunicorn locally for the run")
+    parser.add_argument('--spawn-workers', type=int, default=2)
+    parser.add_argument('--port', type=int, default=5098)
+    parser.add_argument('--json-provider', default='auto', choices=('auto', 'orjson', 'stdlib'),
+                        help="JSON codec for the in-process app")
+    parser.add_argument('--payloads', help="JSONL of recorded transactions (default: synthetic)")
+    parser.add_argument('--endpoints', default=','.join(ENDPOINTS))
+    parser.add_argument('--concurrency', default='1,4,16')
+    parser.add_argument('--rate', type=float, default=0.0, help="target total req/s (0 = as fast as possible)")
+    parser.add_argument('--duration', type=float, default=5.0, help="seconds per scenario")
+    parser.add_argument('--batch-size', type=int, default=100, help="rows per batch/stream request")
+    parser.add_argument('--out', help="write the JSON report here (default: stdout)")
+    parser.add_argument('--baseline', help="compare against this report; exit 1 on regressions")
+    parser.add_argument('--tolerance', type=float, default=0.10)
+    args = parser.parse_args()
+
+    payloads = load_payloads(args.payloads) if args.payloads else synthetic_payloads(10000)
+
+    server = None
+    if args.spawn:
+        server = spawn_server(args.port, args.spawn_workers)
+        args.url = f'http://127.0.0.1:{args.port}'
+    if args.url:
+        make_client, target = (lambda: HttpClient(args.url)), args.url
+    else:
+        make_client, target = in_process_target(args.json_provider), f'in-process ({args.json_provider} json)'
+
+    scenarios = []
+    try:
+        print(f"{'endpoint':>8} {'conc':>5} {'req/s':>9} {'rows/s':>10} {'p50 ms':>8} "
+              f"{'p95 ms':>8} {'p99 ms':>8} {'err%':>6}  stage us (parse/validate/serialize)", file=sys.stderr)
+        for endpoint in args.endpoints.split(','):
+            for concurrency in (int(c) for c in args.concurrency.split(',')):
+                r = run_scenario(make_client, endpoint, concurrency, payloads, args)
+                scenarios.append(r)
+                lat = r["latency_ms"]
+                print(f"{endpoint:>8} {concurrency:>5} {r['throughput_rps']:>9} {r['rows_per_sec']:>10} "
+                      f"{lat['p50']:>8} {lat['p95']:>8} {lat['p99']:>8} {r['error_rate'] * 100:>5.1f}%  "
+                      + '/'.join(str(r['stage_us'].get(k, '-')) for k in ('parse', 'validate', 'serialize')),
+                      file=sys.stderr)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    report = {
+        "target": target,
+        "created_at": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        "payloads": args.payloads or 'synthetic',
+        "scenarios": scenarios,
+    }
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(scenarios, json.load(f), args.tolerance)
+        report["regressions"] = regressions
+        for line in regressions:
+            print(f"❌ REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            exit_code = 1
+        else:
+            print(f"✅ No regressions vs {args.baseline} (tolerance {args.tolerance:.0%})", file=sys.stderr)
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    sys.exit(exit_code)
+
+
+if __name__ == '__main__':
+    main()
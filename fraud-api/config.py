@@ -4,3 +4,173 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'hard-to-guess-string'
     DEBUG = True
     TESTING = False
+
+    # JSON codec: 'auto' uses orjson when installed, 'orjson' requires it,
+    # 'stdlib' forces Flask's default json module
+    JSON_PROVIDER = os.environ.get('JSON_PROVIDER', 'auto')
+
+    # Upper bound on transactions accepted by /predict/batch
+    MAX_BATCH_ITEMS = int(os.environ.get('MAX_BATCH_ITEMS', 5000))
+
+    # Micro-batching: coalesce concurrent single /predict calls into one
+    # model call, flushed at BATCH_MAX_SIZE rows or after BATCH_MAX_WAIT_MS
+    BATCHING_ENABLED = os.environ.get('BATCHING_ENABLED', '0') == '1'
+    BATCH_MAX_SIZE = int(os.environ.get('BATCH_MAX_SIZE', 64))
+    BATCH_MAX_WAIT_MS = float(os.environ.get('BATCH_MAX_WAIT_MS', 2.0))
+    BATCH_MAX_QUEUE = int(os.environ.get('BATCH_MAX_QUEUE', 10000))
+
+    # 'xgboost' scores through XGBClassifier.predict_proba, 'native' walks
+    # the trees with NumPy (lower fixed cost for small batches)
+    INFERENCE_BACKEND = os.environ.get('INFERENCE_BACKEND', 'xgboost')
+    NATIVE_MAX_BATCH = int(os.environ.get('NATIVE_MAX_BATCH', 128))
+
+    # Load (and warm) the model in a background thread so startup is not
+    # blocked; /readyz reports 503 until it is done
+    MODEL_BACKGROUND_LOAD = os.environ.get('MODEL_BACKGROUND_LOAD', '1') == '1'
+    # Versioned artifacts (<MODEL_DIR>/<version>/model.ubj). The newest
+    # version is served unless MODEL_VERSION pins one.
+    MODEL_DIR = os.environ.get('MODEL_DIR')
+    MODEL_VERSION = os.environ.get('MODEL_VERSION')
+    # Model registry: routes (segment, region) routing keys to extra model
+    # versions (see registry.example.json). Read from MODEL_REGISTRY, else
+    # <MODEL_DIR>/registry.json if present. Routed models load on first use
+    # and are kept in an LRU of about MODEL_REGISTRY_MAX_BYTES.
+    MODEL_REGISTRY = os.environ.get('MODEL_REGISTRY')
+    MODEL_REGISTRY_MAX_BYTES = int(os.environ.get('MODEL_REGISTRY_MAX_BYTES', 256 * 1024 * 1024))
+    # Seconds between checks for a newer version (0 = only reload via the
+    # admin endpoint)
+    MODEL_WATCH_INTERVAL = float(os.environ.get('MODEL_WATCH_INTERVAL', 0))
+
+    # Shared secret for /api/v1/admin/* (sent as X-Admin-Token). Admin
+    # endpoints are disabled while it is unset.
+    ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+
+    # Idempotent retries: decisions for requests carrying a transaction_id
+    # are remembered (LRU, TTL in seconds, bounded by estimated bytes)
+    DECISION_CACHE_ENABLED = os.environ.get('DECISION_CACHE_ENABLED', '1') == '1'
+    DECISION_CACHE_TTL = float(os.environ.get('DECISION_CACHE_TTL', 300))
+    DECISION_CACHE_MAX_BYTES = int(os.environ.get('DECISION_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+
+    # Velocity features: sliding-window aggregates per card, account and IP
+    # kept in fixed-size in-process ring buffers (VELOCITY_SLOTS recent
+    # transactions for each of up to VELOCITY_MAX_ENTITIES entities per kind)
+    VELOCITY_ENABLED = os.environ.get('VELOCITY_ENABLED', '1') == '1'
+    VELOCITY_WINDOWS = tuple(int(w) for w in os.environ.get('VELOCITY_WINDOWS', '60,3600').split(','))
+    VELOCITY_MAX_ENTITIES = int(os.environ.get('VELOCITY_MAX_ENTITIES', 20000))
+    VELOCITY_SLOTS = int(os.environ.get('VELOCITY_SLOTS', 16))
+
+    # Rule cascade evaluated before the model (see rules.example.json); the
+    # first matching rule decides and the model is skipped. Unset = no rules.
+    RULES_FILE = os.environ.get('RULES_FILE')
+
+    # Shadow mode: candidate model versions (comma-separated) scored in the
+    # background on the same features as the served model. At most
+    # SHADOW_MAX_QUEUE_ROWS rows wait for the worker; beyond that samples
+    # are dropped, never delaying the request.
+    SHADOW_VERSIONS = [v for v in os.environ.get('SHADOW_VERSIONS', '').split(',') if v]
+    SHADOW_MAX_QUEUE_ROWS = int(os.environ.get('SHADOW_MAX_QUEUE_ROWS', 10000))
+    SHADOW_BATCH_ROWS = int(os.environ.get('SHADOW_BATCH_ROWS', 512))
+
+    # Decision audit log: every decision is buffered in memory and a
+    # background thread appends it in blocks of columnar data to files in
+    # AUDIT_DIR (unset = off), rotated by size or age. When
+    # AUDIT_MAX_BUFFER_ROWS are waiting, AUDIT_OVERFLOW='drop' discards new
+    # decisions (counted) and 'block' makes requests wait for the flusher.
+    # GET /admin/audit without ?since= looks back AUDIT_QUERY_WINDOW_SECONDS.
+    AUDIT_DIR = os.environ.get('AUDIT_DIR')
+    AUDIT_FLUSH_ROWS = int(os.environ.get('AUDIT_FLUSH_ROWS', 4096))
+    AUDIT_FLUSH_INTERVAL = float(os.environ.get('AUDIT_FLUSH_INTERVAL', 1.0))
+    AUDIT_MAX_BUFFER_ROWS = int(os.environ.get('AUDIT_MAX_BUFFER_ROWS', 100000))
+    AUDIT_OVERFLOW = os.environ.get('AUDIT_OVERFLOW', 'drop')
+    AUDIT_ROTATE_BYTES = int(os.environ.get('AUDIT_ROTATE_BYTES', 64 * 1024 * 1024))
+    AUDIT_ROTATE_SECONDS = float(os.environ.get('AUDIT_ROTATE_SECONDS', 3600))
+    AUDIT_FSYNC = os.environ.get('AUDIT_FSYNC', '1') == '1'
+    AUDIT_QUERY_WINDOW_SECONDS = float(os.environ.get('AUDIT_QUERY_WINDOW_SECONDS', 3600))
+
+    # Drift monitoring: streaming sketches of every input feature and the
+    # probability over the last DRIFT_WINDOW_SECONDS (DRIFT_SLOTS slices),
+    # compared with the model artifact's drift_reference.json at
+    # /api/v1/admin/drift. Columns with PSI above DRIFT_PSI_THRESHOLD are
+    # flagged. With several workers, set DRIFT_DIR to a directory they all
+    # share: each writes its window there every DRIFT_SNAPSHOT_SECONDS and
+    # reports merge them.
+    DRIFT_ENABLED = os.environ.get('DRIFT_ENABLED', '1') == '1'
+    DRIFT_WINDOW_SECONDS = float(os.environ.get('DRIFT_WINDOW_SECONDS', 3600))
+    DRIFT_SLOTS = int(os.environ.get('DRIFT_SLOTS', 12))
+    DRIFT_DIR = os.environ.get('DRIFT_DIR')
+    DRIFT_SNAPSHOT_SECONDS = float(os.environ.get('DRIFT_SNAPSHOT_SECONDS', 10))
+    DRIFT_PSI_THRESHOLD = float(os.environ.get('DRIFT_PSI_THRESHOLD', 0.2))
+
+    # Admission control for /predict, /predict/batch and /predict/stream:
+    # per-client token buckets (ADMISSION_CLIENT_RATE req/s, bursts of
+    # ADMISSION_CLIENT_BURST) answered with 429, and at most ADMISSION_MAX_IN_FLIGHT
+    # requests scoring at once. Requests wait for a slot for at most
+    # ADMISSION_TARGET_QUEUE_MS (ADMISSION_MAX_QUEUE of them), then get a
+    # 503. Both carry Retry-After. ADMISSION_MAX_IN_FLIGHT defaults to the
+    # threads that serve requests (SERVER_THREADS, or the ASGI inference
+    # pool). Set ADMISSION_REQUEST_START_HEADER to a header the proxy stamps
+    # (nginx: proxy_set_header X-Request-Start "t=${msec}") to count queueing
+    # in front of the app (accept backlog, thread queue) too; only then, as
+    # callers could send it themselves, and mind proxy/host clock skew.
+    # The client is the remote address unless ADMISSION_CLIENT_HEADER names
+    # a header a trusted proxy sets, overwriting any value the caller sent
+    # (nginx: proxy_set_header X-Real-IP $remote_addr). Behind a proxy
+    # without one, every request comes from the proxy's address and shares
+    # a single bucket, so the whole service is held to ADMISSION_CLIENT_RATE.
+    ADMISSION_ENABLED = os.environ.get('ADMISSION_ENABLED', '0') == '1'
+    ADMISSION_CLIENT_HEADER = os.environ.get('ADMISSION_CLIENT_HEADER') or None
+    ADMISSION_CLIENT_RATE = float(os.environ.get('ADMISSION_CLIENT_RATE', 100))
+    ADMISSION_CLIENT_BURST = float(os.environ.get('ADMISSION_CLIENT_BURST', 200))
+    ADMISSION_MAX_CLIENTS = int(os.environ.get('ADMISSION_MAX_CLIENTS', 10000))
+    ADMISSION_MAX_IN_FLIGHT = int(os.environ.get('ADMISSION_MAX_IN_FLIGHT', 0)) or None
+    ADMISSION_MAX_QUEUE = int(os.environ.get('ADMISSION_MAX_QUEUE', 64))
+    ADMISSION_TARGET_QUEUE_MS = float(os.environ.get('ADMISSION_TARGET_QUEUE_MS', 50))
+    ADMISSION_REQUEST_START_HEADER = os.environ.get('ADMISSION_REQUEST_START_HEADER') or None
+    # Request threads per process (the dev server starts one per request)
+    SERVER_THREADS = 16
+
+    # explain=true requests: per-feature contributions cached per (model
+    # version, feature row), up to this many rows
+    EXPLAIN_CACHE_ENTRIES = int(os.environ.get('EXPLAIN_CACHE_ENTRIES', 10000))
+
+    # /predict/stream scores NDJSON input this many rows at a time
+    STREAM_CHUNK_SIZE = int(os.environ.get('STREAM_CHUNK_SIZE', 512))
+    STREAM_MAX_LINE_BYTES = int(os.environ.get('STREAM_MAX_LINE_BYTES', 64 * 1024))
+
+    # ASGI mode (asgi.py): inference thread pool size and request body cap
+    ASGI_INFERENCE_THREADS = int(os.environ.get('ASGI_INFERENCE_THREADS', 4))
+    ASGI_MAX_BODY_BYTES = int(os.environ.get('ASGI_MAX_BODY_BYTES', 10 * 1024 * 1024))
+
+    # XGBoost threads per process; unset = all cores
+    XGB_NTHREAD = int(os.environ.get('XGB_NTHREAD', 0)) or None
+
+    # On-demand profiling. With PROFILING_ENABLED off no hooks are installed.
+    # When on, PROFILE_SAMPLE_RATE of requests (plus any sending X-Profile: 1
+    # with the admin token) are profiled; report at /api/v1/admin/profile
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', '0') == '1'
+    PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0.0))
+
+
+class ProductionConfig(Config):
+    # Used by gunicorn.conf.py: pre-forked workers behind gunicorn
+    SECRET_KEY = os.environ.get('SECRET_KEY')
+    DEBUG = False
+
+    # Same default as gunicorn.conf.py's threads per worker
+    SERVER_THREADS = int(os.environ.get('GUNICORN_THREADS', 4))
+
+    # Load synchronously in the master before forking, so every worker
+    # shares the same model pages copy-on-write instead of loading its own
+    MODEL_BACKGROUND_LOAD = False
+
+    # Split the cores between workers so N workers don't each start an
+    # all-cores OpenMP pool and oversubscribe the machine
+    XGB_NTHREAD = int(os.environ.get('XGB_NTHREAD', 0)) or max(
+        1, (os.cpu_count() or 1) // int(os.environ.get('WEB_CONCURRENCY', os.cpu_count() or 1))
+    )
+
+
+config_by_name = {
+    'development': Config,
+    'production': ProductionConfig,
+}
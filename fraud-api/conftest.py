@@ -0,0 +1 @@
+# Lets the tests import `app` however pytest is started
@@ -0,0 +1,9 @@
+"""Python client for fraud-api: pooled keep-alive connections, automatic
+batching into /api/v1/predict/batch, and jittered retries that are safe to
+repeat (every transaction carries a transaction_id the server deduplicates).
+Standard library only, so it can be vendored into any service.
+"""
+from fraud_client.aio import AsyncFraudClient
+from fraud_client.client import FraudClient
+from fraud_client.transport import FraudAPIError, Transport
+
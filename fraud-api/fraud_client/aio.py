@@ -0,0 +1,90 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from fraud_client.transport import FraudAPIError, Transport, make_transaction
+
+
+class AsyncFraudClient:
+    """asyncio client for the fraud API.
+
+    Same batching as FraudClient, driven by the event loop: awaited
+    predict() calls are collected for up to max_wait_ms (or until max_batch
+    are waiting) and sent as one /predict/batch request. The HTTP round
+    trip runs on a small thread pool over the same pooled, retrying
+    Transport, so the loop is never blocked by I/O or backoff sleeps.
+
+        async with AsyncFraudClient("http://127.0.0.1:5000") as client:
+            result = await client.predict(250.0, 0.3, 14)
+    """
+
+    def __init__(self, base_url, max_batch=64, max_wait_ms=2.0, max_connections=8, **transport_options):
+        self.transport = Transport(base_url, max_connections=max_connections, **transport_options)
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._senders = ThreadPoolExecutor(max_connections, thread_name_prefix="fraud-client-send")
+        self._pending = []
+        self._timer = None
+        self._tasks = set()
+        self.batches = 0
+
+    async def predict(self, amount, ip_risk, time, transaction_id=None, **fields):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((make_transaction(amount, ip_risk, time, transaction_id, **fields), future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    async def predict_many(self, transactions):
+        return await asyncio.gather(*(self.predict(**transaction) for transaction in transactions))
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending:
+            batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+            self.batches += 1
+            task = asyncio.get_running_loop().create_task(self._send(batch))
+            # The loop only keeps weak references to tasks
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, batch):
+        futures = [future for _, future in batch]
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(
+                self._senders, self.transport.predict_batch, [item for item, _ in batch]
+            )
+        except Exception as e:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for future, result in zip(futures, results):
+            if future.done():
+                continue    # the caller was cancelled
+            if 'error' in result:
+                future.set_exception(FraudAPIError(result['error'], 400))
+            else:
+                future.set_result(result)
+
+    async def aclose(self):
+        # Sends whatever is still queued, then drops the connections
+        self._flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._senders.shutdown(wait=True)
+        self.transport.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    def stats(self):
+        return {"batches": self.batches, **self.transport.stats()}
@@ -0,0 +1,109 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from time import monotonic
+
+from fraud_client.transport import FraudAPIError, Transport, make_transaction
+
+
+def resolve(futures, results):
+    # Hand each caller its own row; per-row validation errors become the
+    # 400 the single /predict endpoint would have returned
+    for future, result in zip(futures, results):
+        if 'error' in result:
+            future.set_exception(FraudAPIError(result['error'], 400))
+        else:
+            future.set_result(result)
+
+
+class FraudClient:
+    """Thread-safe client for the fraud API.
+
+    predict() calls from any number of threads are collected for up to
+    max_wait_ms (or until max_batch are waiting) and sent together as one
+    /predict/batch request over a pooled keep-alive connection; each caller
+    gets its own result back. Up to max_connections batches are in flight
+    at once. Retries and backoff are the Transport's.
+
+        with FraudClient("http://127.0.0.1:5000") as client:
+            result = client.predict(250.0, 0.3, 14, card_id="c-1")
+    """
+
+    def __init__(self, base_url, max_batch=64, max_wait_ms=2.0, max_connections=8, **transport_options):
+        self.transport = Transport(base_url, max_connections=max_connections, **transport_options)
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._senders = ThreadPoolExecutor(max_connections, thread_name_prefix="fraud-client-send")
+        self._pending = []
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="fraud-client-batcher", daemon=True)
+        self._thread.start()
+        self.batches = 0
+
+    def submit(self, amount, ip_risk, time, transaction_id=None, **fields):
+        """Queue one transaction; returns a Future of its result dict."""
+        future = Future()
+        item = make_transaction(amount, ip_risk, time, transaction_id, **fields)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("FraudClient is closed")
+            self._pending.append((item, future))
+            if len(self._pending) == 1 or len(self._pending) >= self.max_batch:
+                self._cond.notify()
+        return future
+
+    def predict(self, amount, ip_risk, time, transaction_id=None, **fields):
+        return self.submit(amount, ip_risk, time, transaction_id, **fields).result()
+
+    def predict_many(self, transactions):
+        # transactions: dicts with amount, ip_risk, time and optional fields;
+        # sent in max_batch chunks, in parallel
+        futures = [self.submit(**transaction) for transaction in transactions]
+        return [future.result() for future in futures]
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                # Wait for company, but never longer than max_wait after the
+                # first row arrived
+                deadline = monotonic() + self.max_wait
+                while len(self._pending) < self.max_batch and not self._closed:
+                    remaining = deadline - monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+            self.batches += 1
+            self._senders.submit(self._send, batch)
+
+    def _send(self, batch):
+        futures = [future for _, future in batch]
+        try:
+            results = self.transport.predict_batch([item for item, _ in batch])
+        except Exception as e:
+            for future in futures:
+                future.set_exception(e)
+        else:
+            resolve(futures, results)
+
+    def close(self):
+        # Sends whatever is still queued, then drops the connections
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+        self._senders.shutdown(wait=True)
+        self.transport.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def stats(self):
+        return {"batches": self.batches, **self.transport.stats()}
@@ -0,0 +1,142 @@
+import http.client
+import json
+import random
+import threading
+import time
+import uuid
+from urllib.parse import urlsplit
+
+# Statuses worth retrying: rate limited, overloaded or a proxy in between
+# failing; anything else is the caller's problem
+RETRY_STATUSES = frozenset((429, 502, 503, 504))
+
+
+class FraudAPIError(Exception):
+    """A request the API rejected, or that still failed after all retries."""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+def make_transaction(amount, ip_risk, time, transaction_id=None, **fields):
+    # One /predict/batch item. Every item gets a transaction_id: the server
+    # remembers the decision per id, so a retried batch is not scored (or
+    # counted by the velocity features) twice.
+    item = {"amount": amount, "ip_risk": ip_risk, "time": time, **fields}
+    item["transaction_id"] = transaction_id or uuid.uuid4().hex
+    return item
+
+
+class Transport:
+    """Keep-alive connections to one fraud-api server, with retries.
+
+    At most max_connections requests are in flight; finished connections
+    go back to an idle pool and are reused. Connection errors and
+    RETRY_STATUSES responses are retried up to `retries` times with full
+    jitter backoff (a random delay up to backoff * 2**attempt, capped at
+    max_backoff), waiting at least as long as the server's Retry-After.
+    """
+
+    def __init__(self, base_url, max_connections=8, timeout=5.0, retries=3,
+                 backoff=0.05, max_backoff=2.0, headers=None):
+        url = urlsplit(base_url)
+        if url.scheme not in ('http', 'https'):
+            raise ValueError(f"Unsupported URL {base_url!r}")
+        self.scheme = url.scheme
+        self.host = url.hostname
+        self.port = url.port
+        self.prefix = url.path.rstrip('/')
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.headers = {'Content-Type': 'application/json', **(headers or {})}
+
+        self._idle = []
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.retried = 0
+        self.connections_opened = 0
+
+    def _connect(self):
+        cls = http.client.HTTPSConnection if self.scheme == 'https' else http.client.HTTPConnection
+        self.connections_opened += 1
+        return cls(self.host, self.port, timeout=self.timeout)
+
+    def _send(self, path, body):
+        # One attempt: (status, headers, decoded body)
+        with self._slots:
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+            if conn is None:
+                conn = self._connect()
+            try:
+                conn.request('POST', self.prefix + path, body, self.headers)
+                response = conn.getresponse()
+                data = response.read()
+            except BaseException:
+                conn.close()
+                raise
+            if response.will_close:
+                conn.close()
+            else:
+                with self._lock:
+                    self._idle.append(conn)
+        try:
+            decoded = json.loads(data) if data else {}
+        except ValueError:
+            decoded = {"error": data[:200].decode('utf-8', 'replace')}
+        return response.status, response.headers, decoded
+
+    def post(self, path, payload):
+        """POST JSON, retrying as described above; returns the decoded body."""
+        body = json.dumps(payload)
+        self.requests += 1
+        attempt = 0
+        while True:
+            retry_after = 0.0
+            try:
+                status, headers, decoded = self._send(path, body)
+            except (OSError, http.client.HTTPException) as e:
+                # Includes a keep-alive connection the server already closed
+                error = FraudAPIError(f"{type(e).__name__}: {e}")
+            else:
+                if status == 200:
+                    return decoded
+                message = decoded.get('error', f"HTTP {status}") if isinstance(decoded, dict) else f"HTTP {status}"
+                error = FraudAPIError(message, status)
+                if status not in RETRY_STATUSES:
+                    raise error
+                try:
+                    retry_after = float(headers.get('Retry-After') or 0)
+                except ValueError:
+                    pass
+            if attempt >= self.retries:
+                raise error
+            delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+            time.sleep(max(delay, retry_after))
+            attempt += 1
+            self.retried += 1
+
+    def predict_batch(self, items):
+        # Items in, one result dict per item out (same order)
+        results = self.post('/api/v1/predict/batch', {"transactions": items})['results']
+        if len(results) != len(items):
+            raise FraudAPIError(f"Expected {len(items)} results, got {len(results)}")
+        return results
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "retries": self.retried,
+            "connections_opened": self.connections_opened,
+            "idle_connections": len(self._idle),
+        }
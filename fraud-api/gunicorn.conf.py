@@ -0,0 +1,28 @@
+# Production server: gunicorn -c gunicorn.conf.py wsgi:app
+#
+# The app (and the model) is loaded once in the master process, then N
+# workers are forked from it and share the model's memory copy-on-write.
+import gc
+import multiprocessing
+import os
+
+os.environ.setdefault('FLASK_CONFIG', 'production')
+
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+preload_app = True
+timeout = 30
+keepalive = 5
+
+
+def pre_fork(server, worker):
+    # Move everything allocated so far out of the GC's reach: collections in
+    # the workers would otherwise touch (and so copy) the shared pages
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    from app.services.fraud_engine import fraud_service
+    fraud_service.after_fork()
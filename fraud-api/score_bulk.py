@@ -0,0 +1,234 @@
+"""Offline bulk scoring: CSV/JSONL in, scored CSV/JSONL out, no Flask.
+
+    python score_bulk.py transactions.jsonl scored.jsonl --workers 8
+    python score_bulk.py history.csv scored.csv --chunk-size 100000 --resume
+
+Input is read in fixed-size chunks that are scored by a pool of worker
+processes; every worker loads the model once. Results are written in input
+order. After each chunk the output is flushed and a checkpoint
+(<output>.checkpoint) records how far we got, so --resume after a crash
+truncates the output back to the last completed chunk and carries on.
+Models trained with velocity features (train.py --velocity) can't be used
+here; pick one without them with --model-version.
+"""
+import argparse
+import contextlib
+import csv
+import io
+import json
+import multiprocessing as mp
+import os
+import sys
+import threading
+import time
+
+from app.api.validation import FEATURES, parse_transaction, parse_transaction_id
+from app.services.fraud_engine import FraudEngine
+from app.services.model_store import ARTIFACTS_DIR, list_versions, read_meta, resolve_model
+
+OUTPUT_FIELDS = ('row', 'transaction_id', 'fraud_probability', 'is_blocked',
+                 'risk_level', 'model_version', 'error')
+
+# --- worker side ---
+_engine = None
+
+
+class ModelLoadError(RuntimeError):
+    pass
+
+
+def _init_worker(model_dir, model_version, backend, threads):
+    # Raising here would make the pool respawn workers forever, so a load
+    # failure is reported from the first _score_chunk call instead
+    global _engine
+    _engine = FraudEngine(model_dir=model_dir, model_version=model_version)
+    _engine.backend = backend
+    if _engine.load():
+        # Several workers share the machine: keep XGBoost from oversubscribing it
+        _engine.model.set_params(n_jobs=threads)
+
+
+def _csv_item(header, values):
+    item = dict(zip(header, values))
+    for name in FEATURES:
+        try:
+            item[name] = float(item[name])
+        except (KeyError, TypeError, ValueError):
+            pass  # left as-is; validation reports it
+    return item
+
+
+def _score_chunk(task):
+    index, first_row, kind, header, lines, out_format = task
+    if not _engine.ready.is_set():
+        raise ModelLoadError(f"Model failed to load: {_engine.load_error}")
+    records, rows, slots = [], [], []
+    for offset, raw in enumerate(lines):
+        record = {"row": first_row + offset}
+        try:
+            item = json.loads(raw) if kind == 'jsonl' else _csv_item(header, raw)
+        except ValueError as e:
+            record["error"] = f"Invalid JSON: {e}"
+            records.append(record)
+            continue
+        row, error = parse_transaction(item)
+        if not error:
+            transaction_id, error = parse_transaction_id(item)
+        if error:
+            record["error"] = error
+        else:
+            if transaction_id is not None:
+                record["transaction_id"] = transaction_id
+            rows.append(row)
+            slots.append(len(records))
+        records.append(record)
+
+    for slot, result in zip(slots, _engine.predict_batch(rows)):
+        records[slot].update(result)
+
+    if out_format == 'csv':
+        buf = io.StringIO()
+        writer = csv.DictWriter(buf, fieldnames=OUTPUT_FIELDS, lineterminator='\n')
+        writer.writerows(records)
+        text = buf.getvalue()
+    else:
+        text = ''.join(json.dumps(r) + '\n' for r in records)
+    return index, text, len(records), len(records) - len(rows)
+
+
+# --- main process ---
+def _read_chunks(path, kind, chunk_size, skip_chunks, out_format, gate):
+    # Yields scoring tasks; `gate` bounds how many chunks are in flight so
+    # the pool cannot read the whole file ahead of the writer
+    with open(path, newline='') as f:
+        if kind == 'csv':
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if header is None:
+                return   # empty file
+            source = (values for values in reader if values)
+        else:
+            header = None
+            source = (line for line in f if line.strip())
+
+        index, chunk = 0, []
+        for item in source:
+            chunk.append(item)
+            if len(chunk) == chunk_size:
+                if index >= skip_chunks:
+                    gate.acquire()
+                    yield index, index * chunk_size, kind, header, chunk, out_format
+                index, chunk = index + 1, []
+        if chunk and index >= skip_chunks:
+            gate.acquire()
+            yield index, index * chunk_size, kind, header, chunk, out_format
+
+
+def _read_checkpoint(path, args):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        state = json.load(f)
+    if state.get('input') != os.path.abspath(args.input) or state.get('chunk_size') != args.chunk_size:
+        sys.exit(f"❌ {path} belongs to a different run (input or chunk size changed)")
+    return state
+
+
+def _write_checkpoint(path, state):
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def _uses_velocity(model_path):
+    return len(read_meta(model_path).get('features', FEATURES)) > len(FEATURES)
+
+
+def _check_model(model_dir, version):
+    # Velocity features need live per-entity state in time order, which
+    # parallel offline chunks can't provide: refuse such models up front
+    try:
+        version, path = resolve_model(model_dir, version)
+    except (ValueError, FileNotFoundError) as e:
+        sys.exit(f"❌ {e}")
+    if not _uses_velocity(path):
+        return
+    usable = [v for v in list_versions(model_dir) if not _uses_velocity(resolve_model(model_dir, v)[1])]
+    hint = f" (available: {', '.join(usable)})" if usable else ""
+    sys.exit(f"❌ Model {version} was trained with velocity features (train.py --velocity), "
+             f"which bulk scoring can't compute. Pass --model-version for a model without them{hint}.")
+
+
+def _format_of(path):
+    return 'csv' if path.lower().endswith('.csv') else 'jsonl'
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score CSV/JSONL transactions offline.")
+    parser.add_argument('input')
+    parser.add_argument('output')
+    parser.add_argument('--chunk-size', type=int, default=50000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--threads-per-worker', type=int, default=1)
+    parser.add_argument('--model-dir', default=ARTIFACTS_DIR)
+    parser.add_argument('--model-version', default=None)
+    parser.add_argument('--backend', choices=('xgboost', 'native'), default='xgboost')
+    parser.add_argument('--resume', action='store_true',
+                        help="continue from <output>.checkpoint instead of starting over")
+    args = parser.parse_args()
+
+    _check_model(args.model_dir, args.model_version)
+    kind, out_format = _format_of(args.input), _format_of(args.output)
+    checkpoint_path = args.output + '.checkpoint'
+    state = _read_checkpoint(checkpoint_path, args) if args.resume else None
+    if state is None:
+        state = {"input": os.path.abspath(args.input), "chunk_size": args.chunk_size,
+                 "chunks_done": 0, "rows": 0, "errors": 0, "output_bytes": 0}
+
+    # Binary mode so tell()/truncate() are plain byte offsets
+    out = open(args.output, 'r+b' if state["chunks_done"] else 'wb')
+    # Anything after the last checkpoint is a partially written chunk
+    out.truncate(state["output_bytes"])
+    out.seek(state["output_bytes"])
+    if state["chunks_done"]:
+        print(f"↩️ Resuming after chunk {state['chunks_done']} ({state['rows']} rows done)")
+    elif out_format == 'csv':
+        out.write((','.join(OUTPUT_FIELDS) + '\n').encode())
+
+    gate = threading.BoundedSemaphore(args.workers * 2)
+    tasks = _read_chunks(args.input, kind, args.chunk_size, state["chunks_done"], out_format, gate)
+    initargs = (args.model_dir, args.model_version, args.backend, args.threads_per_worker)
+
+    start, rows_this_run = time.perf_counter(), 0
+    with mp.Pool(args.workers, initializer=_init_worker, initargs=initargs) as pool:
+        try:
+            for index, text, n_rows, n_errors in pool.imap(_score_chunk, tasks):
+                out.write(text.encode())
+                out.flush()
+                os.fsync(out.fileno())
+                gate.release()
+
+                state.update(chunks_done=index + 1, output_bytes=out.tell(),
+                             rows=state["rows"] + n_rows, errors=state["errors"] + n_errors)
+                _write_checkpoint(checkpoint_path, state)
+
+                rows_this_run += n_rows
+                elapsed = time.perf_counter() - start
+                print(f"chunk {index}: {state['rows']} rows scored, "
+                      f"{rows_this_run / elapsed:,.0f} rows/sec", flush=True)
+        except ModelLoadError as e:
+            sys.exit(f"❌ {e}")
+    out.close()
+
+    elapsed = time.perf_counter() - start
+    rate = rows_this_run / elapsed if elapsed else 0.0
+    print(f"✅ {state['rows']} rows ({state['errors']} invalid) written to {args.output} "
+          f"in {elapsed:.1f}s ({rate:,.0f} rows/sec)")
+    # An input without data rows never writes one
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(checkpoint_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""TreeEnsemble must score exactly like XGBClassifier.predict_proba.
+
+    python -m pytest tests/
+"""
+import numpy as np
+import pytest
+import xgboost as xgb
+
+from app.services.tree_eval import TreeEnsemble
+
+SCALE = np.array([5000.0, 1.0, 24.0])
+TOL = 1e-5
+
+
+def make_data(rng, rows, missing=0.05):
+    # Slightly outside the training range, and with NaNs so every split's
+    # default (missing-value) branch gets taken
+    X = rng.random((rows, 3)) * SCALE * 1.2
+    X[rng.random(X.shape) < missing] = np.nan
+    return X
+
+
+@pytest.fixture(scope='module')
+def rng():
+    return np.random.default_rng(7)
+
+
+@pytest.fixture(scope='module')
+def model(rng):
+    X = make_data(rng, 5000, missing=0.1)
+    y = ((np.nan_to_num(X[:, 0]) / 5000 + np.nan_to_num(X[:, 1], nan=0.5) > 1.1)
+         ^ (rng.random(len(X)) < 0.05)).astype(int)
+    return xgb.XGBClassifier(n_estimators=40, max_depth=5, eval_metric='logloss').fit(X, y)
+
+
+@pytest.fixture(scope='module')
+def evaluator(model):
+    return TreeEnsemble.from_booster(model.get_booster())
+
+
+@pytest.mark.parametrize('rows', [1, 4096])
+def test_matches_predict_proba(model, evaluator, rng, rows):
+    X = make_data(rng, rows)
+    expected = model.predict_proba(X)[:, 1]
+    np.testing.assert_allclose(evaluator.predict_proba(X), expected, rtol=0, atol=TOL)
+
+
+@pytest.mark.parametrize('rows', [1, 64])
+def test_missing_values(model, evaluator, rows):
+    X = np.full((rows, 3), np.nan)
+    expected = model.predict_proba(X)[:, 1]
+    np.testing.assert_allclose(evaluator.predict_proba(X), expected, rtol=0, atol=TOL)
+
+
+def test_loaded_model(model, rng, tmp_path):
+    # The engine builds the evaluator from a model loaded off disk
+    path = str(tmp_path / 'model.ubj')
+    model.save_model(path)
+    loaded = xgb.XGBClassifier()
+    loaded.load_model(path)
+    X = make_data(rng, 512)
+    expected = model.predict_proba(X)[:, 1]
+    got = TreeEnsemble.from_booster(loaded.get_booster()).predict_proba(X)
+    np.testing.assert_allclose(got, expected, rtol=0, atol=TOL)
+
+
+def test_early_stopped_model(rng):
+    # predict_proba only uses trees up to best_iteration
+    X, X_val = make_data(rng, 3000), make_data(rng, 1000)
+    y, y_val = (rng.random(3000) < 0.3).astype(int), (rng.random(1000) < 0.3).astype(int)
+    model = xgb.XGBClassifier(n_estimators=200, max_depth=4, eval_metric='logloss', early_stopping_rounds=5)
+    model.fit(X, y, eval_set=[(X_val, y_val)], verbose=False)
+    assert model.best_iteration < 199
+    X_test = make_data(rng, 256)
+    expected = model.predict_proba(X_test)[:, 1]
+    got = TreeEnsemble.from_booster(model.get_booster()).predict_proba(X_test)
+    np.testing.assert_allclose(got, expected, rtol=0, atol=TOL)
+
+
+def test_rejects_other_objectives(rng):
+    X = make_data(rng, 200)
+    model = xgb.XGBRegressor(n_estimators=3).fit(X, rng.random(200))
+    with pytest.raises(ValueError, match='objective'):
+        TreeEnsemble.from_booster(model.get_booster())
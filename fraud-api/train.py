@@ -0,0 +1,313 @@
+"""Out-of-core training: labeled transaction history on disk -> versioned artifact.
+
+    python train.py history.csv
+    python train.py 2026-*.jsonl --velocity --rounds 400 --holdout 0.1 --validation 0.1
+
+Input rows (CSV with a header, or JSONL) must be in time order, across
+files in the order given:
+
+    ts          unix seconds of the transaction
+    amount, ip_risk
+    time        hour of day; derived from ts when absent
+    is_fraud    label, 0/1
+    card_id, account_id, ip_address, merchant_id
+                optional, only used with --velocity
+
+Nothing is ever loaded whole. Pass 1 streams the input in --chunk-rows
+chunks, computes the feature matrix (replaying --velocity features through
+the same FeatureStore the server uses) and spills each chunk to .npy files.
+The last --holdout fraction of rows (the most recent ones) is held out,
+and the --validation fraction just before it drives early stopping.
+Pass 2 feeds the training chunks to XGBoost through a DataIter into an
+external-memory quantile matrix (tree_method=hist), so XGBoost keeps its
+own compressed pages on disk instead of a copy of the data. Peak RSS is
+bounded by the chunk size, the velocity arena and XGBoost's working set,
+not by the history length. The holdout plays no part in choosing the
+model; it is scored chunk by chunk and its metrics are stored in the
+artifact's meta.json.
+"""
+import argparse
+import csv
+import json
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from itertools import islice
+
+import numpy as np
+import xgboost as xgb
+
+from app.api.validation import ENTITY_FIELDS, FEATURES
+from app.services.drift import PROBABILITY, REFERENCE_FILE, Sketch
+from app.services.feature_store import FeatureStore
+from app.services.fraud_engine import BLOCK_THRESHOLD
+from app.services.model_store import ARTIFACTS_DIR, save_model
+from config import Config
+
+LABEL = 'is_fraud'
+
+
+def peak_rss_mb():
+    # ru_maxrss is in KiB on Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+# --- pass 1: stream, featurize, spill ---
+def _read_records(path, chunk_rows):
+    # Yields lists of dicts, chunk_rows at a time
+    with open(path, newline='') as f:
+        if path.endswith('.jsonl') or path.endswith('.ndjson'):
+            records = (json.loads(line) for line in f if line.strip())
+        else:
+            records = csv.DictReader(f)
+        while True:
+            chunk = list(islice(records, chunk_rows))
+            if not chunk:
+                return
+            yield chunk
+
+
+def _column(chunk, name, path):
+    try:
+        return np.array([r[name] for r in chunk], dtype=np.float64)
+    except KeyError:
+        raise ValueError(f"{path}: missing column '{name}'") from None
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"{path}: bad value in column '{name}' ({e})") from None
+
+
+def _entities(record):
+    # Empty CSV cells and JSON nulls both mean "no id"
+    return tuple(
+        str(record[f]) if record.get(f) not in (None, '') else None for f in ENTITY_FIELDS
+    )
+
+
+def featurize(paths, work_dir, chunk_rows, store=None):
+    # Returns [(x_path, y_path, rows)] in time order, plus the ts range
+    chunks, last_ts, first_ts = [], -np.inf, None
+    for path in paths:
+        for chunk in _read_records(path, chunk_rows):
+            ts = _column(chunk, 'ts', path)
+            if ts[0] < last_ts or np.any(np.diff(ts) < 0):
+                raise ValueError(f"{path}: rows are not in time order (sort by ts first); "
+                                 f"the holdout must be the most recent data")
+            first_ts = ts[0] if first_ts is None else first_ts
+            last_ts = ts[-1]
+
+            amount = _column(chunk, 'amount', path)
+            hour = _column(chunk, 'time', path) if 'time' in chunk[0] else (ts // 3600) % 24
+            X = np.column_stack([amount, _column(chunk, 'ip_risk', path), hour])
+            if store is not None:
+                velocity = [
+                    store.features(_entities(r), a, t)
+                    for r, a, t in zip(chunk, amount.tolist(), ts.tolist())
+                ]
+                X = np.hstack([X, np.array(velocity)])
+
+            n = len(chunks)
+            x_path = os.path.join(work_dir, f'x-{n:05d}.npy')
+            y_path = os.path.join(work_dir, f'y-{n:05d}.npy')
+            np.save(x_path, X.astype(np.float32))
+            np.save(y_path, _column(chunk, LABEL, path).astype(np.float32))
+            chunks.append((x_path, y_path, len(X)))
+            print(f"  featurized {sum(c[2] for c in chunks):,} rows", file=sys.stderr, end='\r')
+    print(file=sys.stderr)
+    return chunks, (first_ts, last_ts)
+
+
+def split_chunks(chunks, validation, holdout):
+    # Time-ordered split into (x_path, y_path, start, stop) slices: the
+    # last `holdout` fraction of rows is the holdout, the `validation`
+    # fraction before it the validation set, the rest training data
+    total = sum(rows for _, _, rows in chunks)
+    test_cut = total - int(total * holdout)
+    valid_cut = test_cut - int(total * validation)
+    parts, offset = ([], [], []), 0
+    for x_path, y_path, rows in chunks:
+        for part, lo, hi in zip(parts, (0, valid_cut, test_cut), (valid_cut, test_cut, total)):
+            start, stop = max(lo - offset, 0), min(hi - offset, rows)
+            if start < stop:
+                part.append((x_path, y_path, start, stop))
+        offset += rows
+    return parts
+
+
+# --- pass 2: external-memory training ---
+class ChunkIter(xgb.DataIter):
+    """Hands spilled chunks to XGBoost one at a time.
+
+    XGBoost may iterate several times (sketching, then page building); each
+    pass memory-maps one chunk, and release_data lets it drop the chunk
+    once its own compressed page is written under cache_prefix.
+    """
+
+    def __init__(self, slices, cache_prefix):
+        self.slices = slices
+        self._i = 0
+        super().__init__(cache_prefix=cache_prefix, release_data=True)
+
+    def next(self, input_data):
+        if self._i == len(self.slices):
+            return False
+        x_path, y_path, start, stop = self.slices[self._i]
+        input_data(
+            data=np.load(x_path, mmap_mode='r')[start:stop],
+            label=np.load(y_path, mmap_mode='r')[start:stop],
+        )
+        self._i += 1
+        return True
+
+    def reset(self):
+        self._i = 0
+
+
+def holdout_metrics(booster, slices, dtest, reference=None):
+    # Threshold metrics at the serving threshold, accumulated per chunk;
+    # reference (a drift Sketch) gets the holdout features and probabilities
+    scores = dict(
+        item.split(':') for item in booster.eval_set([(dtest, 'holdout')]).split('\t')[1:]
+    )
+    tp = fp = fn = positives = rows = 0
+    for x_path, y_path, start, stop in slices:
+        X = np.load(x_path, mmap_mode='r')[start:stop]
+        y = np.load(y_path, mmap_mode='r')[start:stop] > 0.5
+        probs = booster.inplace_predict(X)
+        if reference is not None:
+            reference.update(np.column_stack([X, probs]))
+        blocked = probs > BLOCK_THRESHOLD
+        tp += int(np.count_nonzero(blocked & y))
+        fp += int(np.count_nonzero(blocked & ~y))
+        fn += int(np.count_nonzero(~blocked & y))
+        positives += int(np.count_nonzero(y))
+        rows += len(y)
+    return {
+        "rows": rows,
+        "fraud_rate": round(positives / rows, 6) if rows else None,
+        "auc": round(float(scores['holdout-auc']), 6),
+        "logloss": round(float(scores['holdout-logloss']), 6),
+        "threshold": BLOCK_THRESHOLD,
+        "precision": round(tp / (tp + fp), 6) if tp + fp else None,
+        "recall": round(tp / (tp + fn), 6) if tp + fn else None,
+        "blocked_rate": round((tp + fp) / rows, 6) if rows else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('inputs', nargs='+', help="CSV or JSONL files, in time order")
+    parser.add_argument('--velocity', action='store_true',
+                        help="add per-entity velocity features (needs the id columns)")
+    parser.add_argument('--holdout', type=float, default=0.2,
+                        help="fraction of the most recent rows held out")
+    parser.add_argument('--validation', type=float, default=0.1,
+                        help="fraction of rows just before the holdout used for early stopping")
+    parser.add_argument('--chunk-rows', type=int, default=100000)
+    parser.add_argument('--rounds', type=int, default=300)
+    parser.add_argument('--early-stopping', type=int, default=20,
+                        help="stop when validation logloss hasn't improved for N rounds (0 = off)")
+    parser.add_argument('--max-depth', type=int, default=6)
+    parser.add_argument('--eta', type=float, default=0.1)
+    parser.add_argument('--max-bin', type=int, default=256)
+    parser.add_argument('--nthread', type=int, default=os.cpu_count(),
+                        help="XGBoost threads (default: all cores)")
+    parser.add_argument('--model-dir', default=ARTIFACTS_DIR)
+    parser.add_argument('--work-dir', default=None,
+                        help="where spilled chunks and XGBoost's page cache go (default: a temp dir)")
+    args = parser.parse_args()
+    if not 0 < args.holdout < 1:
+        parser.error("--holdout must be between 0 and 1")
+    if not 0 < args.validation < 1 - args.holdout:
+        parser.error("--validation must be above 0, and --validation plus --holdout below 1")
+
+    store = None
+    names = list(FEATURES)
+    if args.velocity:
+        store = FeatureStore(
+            windows=Config.VELOCITY_WINDOWS,
+            max_entities=Config.VELOCITY_MAX_ENTITIES,
+            slots=Config.VELOCITY_SLOTS,
+        )
+        names += list(store.names)
+
+    work_dir = tempfile.mkdtemp(prefix='fraud-train-', dir=args.work_dir)
+    try:
+        start = time.perf_counter()
+        print(f"Pass 1: featurizing {', '.join(args.inputs)} ({len(names)} features)...")
+        try:
+            chunks, (first_ts, last_ts) = featurize(args.inputs, work_dir, args.chunk_rows, store)
+        except ValueError as e:
+            sys.exit(f"❌ {e}")
+        train, valid, test = split_chunks(chunks, args.validation, args.holdout)
+        if not train or not valid or not test:
+            sys.exit("❌ Not enough rows for a train/validation/holdout split")
+        featurize_s = time.perf_counter() - start
+
+        print(f"Pass 2: training on {sum(s[3] - s[2] for s in train):,} rows, "
+              f"validating on {sum(s[3] - s[2] for s in valid):,}, "
+              f"holding out {sum(s[3] - s[2] for s in test):,}...")
+        start = time.perf_counter()
+        cache = os.path.join(work_dir, 'cache')
+        dtrain = xgb.ExtMemQuantileDMatrix(ChunkIter(train, cache + '-train'), max_bin=args.max_bin)
+        dvalid = xgb.ExtMemQuantileDMatrix(ChunkIter(valid, cache + '-valid'), max_bin=args.max_bin, ref=dtrain)
+        dtest = xgb.ExtMemQuantileDMatrix(ChunkIter(test, cache + '-holdout'), max_bin=args.max_bin, ref=dtrain)
+        params = {
+            "objective": "binary:logistic",
+            "tree_method": "hist",
+            "max_bin": args.max_bin,
+            "max_depth": args.max_depth,
+            "eta": args.eta,
+            "nthread": args.nthread,
+            "eval_metric": ["auc", "logloss"],
+        }
+        # Model selection sees only the validation slice, so the holdout
+        # metrics below are an unbiased estimate
+        booster = xgb.train(
+            params, dtrain, num_boost_round=args.rounds,
+            evals=[(dvalid, 'validation')],
+            early_stopping_rounds=args.early_stopping or None, verbose_eval=False,
+        )
+        # Early stopping keeps training past the best round; ship the best one
+        best = booster.best_iteration if 'best_iteration' in booster.attributes() else args.rounds - 1
+        booster = booster[:best + 1]
+        train_s = time.perf_counter() - start
+        # The holdout is the most recent traffic: the baseline live drift is
+        # measured against
+        reference = Sketch(names + [PROBABILITY])
+        metrics = holdout_metrics(booster, test, dtest, reference)
+        del dtrain, dvalid, dtest   # releases XGBoost's page cache files
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    meta = {
+        "features": names,
+        "trainer": "train.py",
+        "params": params,
+        "rounds": booster.num_boosted_rounds(),
+        "rows": {"train": sum(s[3] - s[2] for s in train), "validation": sum(s[3] - s[2] for s in valid),
+                 "holdout": metrics["rows"]},
+        "ts_range": [first_ts, last_ts],
+        "holdout": metrics,
+        "featurize_s": round(featurize_s, 1),
+        "train_s": round(train_s, 1),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    if store is not None:
+        meta["velocity_windows"] = list(Config.VELOCITY_WINDOWS)
+
+    # Same layout as every other version: running servers pick it up via
+    # /api/v1/admin/reload or the model watcher
+    version, save_path = save_model(
+        booster, args.model_dir, meta=meta, files={REFERENCE_FILE: json.dumps(reference.to_dict())}
+    )
+    print(f"  holdout AUC {metrics['auc']:.4f}, logloss {metrics['logloss']:.4f}, "
+          f"precision {metrics['precision']}, recall {metrics['recall']} at {BLOCK_THRESHOLD}")
+    print(f"  {meta['rounds']} rounds in {meta['train_s']} s, peak RSS {meta['peak_rss_mb']} MB")
+    print(f"✅ Model {version} saved to {save_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,9 @@
+import os
+
 from app import create_app
+from config import config_by_name
 
-app = create_app()
+app = create_app(config_by_name[os.environ.get('FLASK_CONFIG', 'development')])
 
 if __name__ == "__main__":
     app.run(host='0.0.0.0', port=5000)
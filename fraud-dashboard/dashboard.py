@@ -1,59 +1,151 @@
 import streamlit as st
+import altair as alt
+import hashlib
 import joblib
 import numpy as np
+import pandas as pd
 import os
 
+MODEL_PATH = 'model.pkl'
+THRESHOLD = 0.7
+
 # --- 1. SETUP & MODEL LOADING ---
 st.set_page_config(page_title="Fraud Hunter", page_icon="🕵️")
 
 @st.cache_resource
-def load_model():
+def load_model(mtime):
     # Streamlit needs caching, or it reloads the model on every click!
-    if os.path.exists('model.pkl'):
-        return joblib.load('model.pkl')
+    # mtime is only part of the cache key: a retrained model.pkl is reloaded.
+    if os.path.exists(MODEL_PATH):
+        with open(MODEL_PATH, 'rb') as f:
+            model_hash = hashlib.sha256(f.read()).hexdigest()[:16]
+        return joblib.load(MODEL_PATH), model_hash
     else:
-        return None
+        return None, None
+
+model, model_hash = load_model(os.path.getmtime(MODEL_PATH) if os.path.exists(MODEL_PATH) else None)
+
+
+@st.cache_data(max_entries=200, show_spinner=False)
+def score_slice(_model, model_hash, max_amount, n_amounts, n_risks, hour):
+    # One predict_proba call for the whole amount x ip_risk grid at one hour.
+    # Cached by (model hash, grid spec, hour): moving the time slider only
+    # scores hours that haven't been seen yet. _model is not hashed.
+    amounts = np.linspace(0, max_amount, n_amounts)
+    risks = np.linspace(0, 1, n_risks)
+    grid_amount, grid_risk = np.meshgrid(amounts, risks)
+    features = np.column_stack([
+        grid_amount.ravel(), grid_risk.ravel(), np.full(grid_amount.size, float(hour))
+    ])
+    return _model.predict_proba(features)[:, 1].reshape(n_risks, n_amounts)
+
+
+def boundary_cells(probs):
+    # Blocked cells with at least one allowed neighbour: where the
+    # decision flips
+    blocked = probs > THRESHOLD
+    padded = np.pad(blocked, 1, mode='edge')
+    neighbours_allowed = (
+        ~padded[:-2, 1:-1] | ~padded[2:, 1:-1] | ~padded[1:-1, :-2] | ~padded[1:-1, 2:]
+    )
+    return blocked & neighbours_allowed
+
+
+def surface_chart(probs, max_amount):
+    n_risks, n_amounts = probs.shape
+    amount_step, risk_step = max_amount / max(n_amounts - 1, 1), 1 / max(n_risks - 1, 1)
+    risk_idx, amount_idx = np.indices(probs.shape)
+    cells = pd.DataFrame({
+        "amount": (amount_idx * amount_step).ravel(),
+        "ip_risk": (risk_idx * risk_step).ravel(),
+        "fraud_probability": probs.ravel(),
+    })
+    cells["amount_end"] = cells["amount"] + amount_step
+    cells["ip_risk_end"] = cells["ip_risk"] + risk_step
+
+    heatmap = alt.Chart(cells).mark_rect().encode(
+        x=alt.X("amount:Q", title="Transaction Amount ($)"),
+        x2="amount_end",
+        y=alt.Y("ip_risk:Q", title="IP Risk Score"),
+        y2="ip_risk_end",
+        color=alt.Color("fraud_probability:Q", scale=alt.Scale(scheme="redyellowgreen", reverse=True, domain=[0, 1])),
+        tooltip=["amount", "ip_risk", "fraud_probability"],
+    )
+    edge = boundary_cells(probs).ravel()
+    boundary = alt.Chart(cells[edge]).mark_square(color="black", size=8).encode(
+        x="amount:Q", y="ip_risk:Q",
+    )
+    return (heatmap + boundary).properties(height=420)
 
-model = load_model()
 
 # --- 2. THE UI (FRONTEND) ---
 st.title("🕵️ Fraud Detection Dashboard")
-st.markdown("Use the sliders to simulate a transaction.")
+mode = st.radio("Mode", ["Single transaction", "Risk surface"], horizontal=True)
 
-col1, col2 = st.columns(2)
-with col1:
-    amount = st.number_input("Transaction Amount ($)", min_value=0, max_value=10000, value=500)
-    time = st.slider("Time of Day (24h)", 0, 24, 12)
+if mode == "Single transaction":
+    st.markdown("Use the sliders to simulate a transaction.")
 
-with col2:
-    ip_risk = st.slider("IP Risk Score (0=Safe, 1=Risky)", 0.0, 1.0, 0.1)
+    col1, col2 = st.columns(2)
+    with col1:
+        amount = st.number_input("Transaction Amount ($)", min_value=0, max_value=10000, value=500)
+        time = st.slider("Time of Day (24h)", 0, 24, 12)
 
-# --- 3. THE LOGIC (BACKEND) ---
-# In Flask, this was in 'services/fraud_engine.py'. Here, it is mixed in.
-if st.button("Analyze Transaction"):
-    if model:
-        features = np.array([[amount, ip_risk, time]])
-        prob = model.predict_proba(features)[0][1]
-        
-        st.divider()
-        st.subheader("Analysis Result")
-        
-        # Visualizing the Output
-        st.metric(label="Fraud Probability", value=f"{prob:.2%}")
-        
-        if prob > 0.7:
-            st.error("🚨 BLOCKED: High Risk Transaction Detected")
-            st.json({
-                "status": "BLOCKED",
-                "reason": "Risk Score > 0.7",
-                "risk_score": prob
-            })
+    with col2:
+        ip_risk = st.slider("IP Risk Score (0=Safe, 1=Risky)", 0.0, 1.0, 0.1)
+
+    # --- 3. THE LOGIC (BACKEND) ---
+    # In Flask, this was in 'services/fraud_engine.py'. Here, it is mixed in.
+    if st.button("Analyze Transaction"):
+        if model:
+            features = np.array([[amount, ip_risk, time]])
+            prob = model.predict_proba(features)[0][1]
+
+            st.divider()
+            st.subheader("Analysis Result")
+
+            # Visualizing the Output
+            st.metric(label="Fraud Probability", value=f"{prob:.2%}")
+
+            if prob > THRESHOLD:
+                st.error("🚨 BLOCKED: High Risk Transaction Detected")
+                st.json({
+                    "status": "BLOCKED",
+                    "reason": f"Risk Score > {THRESHOLD}",
+                    "risk_score": prob
+                })
+            else:
+                st.success("✅ APPROVED: Transaction looks safe")
+                st.balloons()
         else:
-            st.success("✅ APPROVED: Transaction looks safe")
-            st.balloons()
+            st.error("Model not found! Run make_model.py first.")
+
+    # --- 4. DEBUGGING INFO ---
+    with st.expander("See Raw Inputs"):
+        st.write(f"Inputs: Amount={amount}, IP={ip_risk}, Time={time}")
+
+else:
+    # --- 3. WHAT-IF SURFACE: every amount x IP risk combination at once ---
+    st.markdown(f"Fraud probability over a grid of amounts and IP risk scores. "
+                f"Black cells mark where the {THRESHOLD} blocking threshold is crossed.")
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        max_amount = st.number_input("Max Amount ($)", min_value=100, max_value=100000, value=10000, step=100)
+    with col2:
+        n_amounts = st.number_input("Amount steps", min_value=10, max_value=500, value=200, step=10)
+    with col3:
+        n_risks = st.number_input("IP risk steps", min_value=10, max_value=200, value=100, step=10)
+    time = st.slider("Time of Day (24h)", 0, 24, 12)
+
+    if model:
+        probs = score_slice(model, model_hash, float(max_amount), int(n_amounts), int(n_risks), time)
+        st.altair_chart(surface_chart(probs, float(max_amount)), width="stretch")
+        st.metric(label="Share of grid blocked", value=f"{np.mean(probs > THRESHOLD):.1%}")
+
+        # --- 4. DEBUGGING INFO ---
+        with st.expander("See Grid Spec"):
+            st.write(f"Model {model_hash}: {n_amounts} amounts from 0 to {max_amount}, "
+                     f"{n_risks} IP risk values from 0 to 1, hour {time} "
+                     f"({int(n_amounts) * int(n_risks)} rows per predict_proba call)")
     else:
         st.error("Model not found! Run make_model.py first.")
-
-# --- 4. DEBUGGING INFO ---
-with st.expander("See Raw Inputs"):
-    st.write(f"Inputs: Amount={amount}, IP={ip_risk}, Time={time}")
@@ -12,7 +12,7 @@ X = np.array([
 y = np.array([0, 1, 0, 1])
 
 print("Training dummy XGBoost model...")
-model = xgb.XGBClassifier(use_label_encoder=False, eval_metric='logloss')
+model = xgb.XGBClassifier(eval_metric='logloss')
 model.fit(X, y)
 joblib.dump(model, 'model.pkl')
 print("✅ Model saved as model.pkl")